@@ -1,30 +1,90 @@
-import sys
+import time
+
+# Точка отсчета для --profile-startup: до импорта Tk и модулей приложения
+STARTUP_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import messagebox, scrolledtext, filedialog, ttk
-import requests
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import xml.etree.ElementTree as ET
+import importlib
 import json
 import os
-import traceback
-import time
-import re
-import socket
-from urllib.parse import urlparse
+import sys
 from threading import Thread, Event
 import atexit
 
-BASE_URL = "https://api.namecheap.com/xml.response"
-CONFIG_FILE = "config.json"
-REQUEST_DELAY = 10
-DNS_PROPAGATION_DELAY = 30
+from engine import (CHECK_COLUMNS, RUNTIME_SETTINGS, DNSEngine, find_interrupted_operation, get_config_path,
+                    get_current_ip, get_data_dir, load_config)
+from log_pipeline import DEFAULT_MAX_LINES, LOG_FILE, LogPipeline
+from namecheap import NamecheapClient
+from ratelimit import RateLimiter
+from run_metrics import format_summary
+from sheets import SheetsClient
+
+
+RESULT_COLUMNS = ("Domain", *CHECK_COLUMNS, "Verified")
+RESULTS_PAGE_SIZE = 200
+FILTER_ALL = "All domains"
+FILTER_FAILED = "Failed only"
+FILTER_VERIFIED = "Verified only"
+FILTER_FAILED_COLUMN = "Failed: {}"
+
+
+class ResultsModel:
+    """Строки результатов, посчитанные один раз: фильтр, сортировка и страницы без Tk"""
+
+    def __init__(self, results):
+        # (домен, флаги CHECK_COLUMNS..., verified)
+        self.rows = []
+        for domain, results_data in results.items():
+            flags = tuple(bool(results_data.get(name, False)) for name in CHECK_COLUMNS)
+            self.rows.append((domain, *flags, all(results_data.values())))
+
+        self.total = len(self.rows)
+        self.verified = sum(row[-1] for row in self.rows)
+        self.failed_by_column = {name: sum(not row[i] for row in self.rows)
+                                 for i, name in enumerate(CHECK_COLUMNS, start=1)}
+        self.view = self.rows
+
+    def filters(self):
+        return [FILTER_ALL, FILTER_FAILED, FILTER_VERIFIED,
+                *(FILTER_FAILED_COLUMN.format(name) for name in CHECK_COLUMNS)]
+
+    def summary(self):
+        failed_columns = ", ".join(f"{name} {count}" for name, count in self.failed_by_column.items() if count)
+        text = f"Total: {self.total}   Verified: {self.verified}   Failed: {self.total - self.verified}"
+        return f"{text}   ({failed_columns})" if failed_columns else text
+
+    def apply(self, filter_name=FILTER_ALL, sort_column=None, reverse=False):
+        if filter_name == FILTER_FAILED:
+            rows = [row for row in self.rows if not row[-1]]
+        elif filter_name == FILTER_VERIFIED:
+            rows = [row for row in self.rows if row[-1]]
+        elif filter_name.startswith(FILTER_FAILED_COLUMN.format("")):
+            index = RESULT_COLUMNS.index(filter_name[len(FILTER_FAILED_COLUMN.format("")):])
+            rows = [row for row in self.rows if not row[index]]
+        else:
+            rows = self.rows
+
+        if sort_column is not None:
+            index = RESULT_COLUMNS.index(sort_column)
+            rows = sorted(rows, key=lambda row: row[index], reverse=reverse)
+        self.view = rows
+        return len(rows)
+
+    def page_count(self, page_size=RESULTS_PAGE_SIZE):
+        return max(1, -(-len(self.view) // page_size))
+
+    def page(self, number, page_size=RESULTS_PAGE_SIZE):
+        return self.view[number * page_size:(number + 1) * page_size]
+
 
 class ResultsWindow:
-    def __init__(self, parent, results, operation_type="verification"):
+    """Окно итогов: в Treeview только строки текущей страницы"""
+
+    def __init__(self, parent, results, operation_type="verification", metrics=None):
         self.window = tk.Toplevel(parent)
         self.window.title("Results Summary")
-        self.window.geometry("950x500")
+        self.window.geometry("950x560")
         self.window.transient(parent)
         self.window.grab_set()
         
@@ -33,6 +93,11 @@ class ResultsWindow:
         x = parent.winfo_x() + (parent.winfo_width() - self.window.winfo_width()) // 2
         y = parent.winfo_y() + (parent.winfo_height() - self.window.winfo_height()) // 2
         self.window.geometry(f"+{x}+{y}")
+
+        self.model = ResultsModel(results)
+        self.page_number = 0
+        self.sort_column = None
+        self.sort_reverse = False
         
         # Создание фрейма для результатов
         frame = ttk.Frame(self.window, padding="10")
@@ -46,19 +111,33 @@ class ResultsWindow:
         
         ttk.Label(frame, text=title_text, 
                  font=("Arial", 14, "bold")).pack(pady=(0, 10))
+        ttk.Label(frame, text=self.model.summary()).pack(pady=(0, 5))
+
+        # Время по фазам запуска (RunMetrics.summary)
+        if metrics:
+            timing = ttk.LabelFrame(frame, text="Timing", padding=5)
+            timing.pack(fill=tk.X, pady=(0, 5))
+            ttk.Label(timing, text="   ".join(format_summary(metrics)), wraplength=900).pack(anchor=tk.W)
+
+        # Фильтр и переключение страниц
+        controls = ttk.Frame(frame)
+        controls.pack(side=tk.BOTTOM, fill=tk.X, pady=(5, 0))
+        self.filter_var = tk.StringVar(value=FILTER_ALL)
+        filter_box = ttk.Combobox(controls, textvariable=self.filter_var, values=self.model.filters(),
+                                  state="readonly", width=22)
+        filter_box.bind("<<ComboboxSelected>>", lambda e: self.refresh(reset_page=True))
+        filter_box.pack(side=tk.LEFT)
+        ttk.Button(controls, text="Next >", command=lambda: self.show_page(self.page_number + 1)).pack(side=tk.RIGHT)
+        self.page_label = ttk.Label(controls)
+        self.page_label.pack(side=tk.RIGHT, padx=10)
+        ttk.Button(controls, text="< Prev", command=lambda: self.show_page(self.page_number - 1)).pack(side=tk.RIGHT)
         
         # Таблица результатов
-        columns = ("Domain", "Redirect", "Tracking", "SPF", "DMARC", "Mail Settings", "Verified")
-        tree = ttk.Treeview(frame, columns=columns, show="headings", height=15)
+        tree = ttk.Treeview(frame, columns=RESULT_COLUMNS, show="headings", height=15)
         
-        # Настройка колонок
-        tree.heading("Domain", text="Domain")
-        tree.heading("Redirect", text="Redirect")
-        tree.heading("Tracking", text="Tracking")
-        tree.heading("SPF", text="SPF")
-        tree.heading("DMARC", text="DMARC")
-        tree.heading("Mail Settings", text="Mail Settings")
-        tree.heading("Verified", text="Verified")
+        # Настройка колонок; клик по заголовку сортирует
+        for name in RESULT_COLUMNS:
+            tree.heading(name, text=name, command=lambda name=name: self.sort_by(name))
         
         tree.column("Domain", width=180)
         tree.column("Redirect", width=80, anchor="center")
@@ -68,25 +147,6 @@ class ResultsWindow:
         tree.column("Mail Settings", width=100, anchor="center")
         tree.column("Verified", width=100, anchor="center")
         
-        # Добавление данных
-        for domain, results_data in results.items():
-            status_values = []
-            for setting in ["Redirect", "Tracking", "SPF", "DMARC", "Mail Settings"]:
-                status = results_data.get(setting, False)
-                status_values.append("✓" if status else "✗")
-            
-            # Проверяем, прошел ли домен верификацию (все поля True)
-            is_verified = all(results_data.values())
-            status_values.append("✓" if is_verified else "✗")
-            
-            item_id = tree.insert("", tk.END, values=(domain, *status_values))
-            
-            # Подсветка строки - темно-зеленый для успеха, темно-красный для неудачи
-            if is_verified:
-                tree.item(item_id, tags=('success',))
-            else:
-                tree.item(item_id, tags=('failed',))
-        
         # Настройка тегов для подсветки
         tree.tag_configure('success', background='#155724', foreground='white')  # Темно-зеленый
         tree.tag_configure('failed', background='#721c24', foreground='white')   # Темно-красный
@@ -97,6 +157,30 @@ class ResultsWindow:
         
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree = tree
+
+        self.show_page(0)
+
+    def sort_by(self, column):
+        # Повторный клик по той же колонке меняет направление
+        self.sort_reverse = not self.sort_reverse if self.sort_column == column else False
+        self.sort_column = column
+        self.refresh()
+
+    def refresh(self, reset_page=False):
+        self.model.apply(self.filter_var.get(), self.sort_column, self.sort_reverse)
+        self.show_page(0 if reset_page else self.page_number)
+
+    def show_page(self, number):
+        self.page_number = min(max(0, number), self.model.page_count() - 1)
+        self.tree.delete(*self.tree.get_children())
+        for row in self.model.page(self.page_number):
+            values = (row[0], *("✓" if ok else "✗" for ok in row[1:]))
+            # Подсветка строки - темно-зеленый для успеха, темно-красный для неудачи
+            self.tree.insert("", tk.END, values=values, tags=('success' if row[-1] else 'failed',))
+        self.page_label.config(text=f"Page {self.page_number + 1}/{self.model.page_count()} "
+                                    f"({len(self.model.view)} domains)")
+
 
 class DNSAutomator:
     def __init__(self, root):
@@ -104,13 +188,10 @@ class DNSAutomator:
         self.root.title("DNS Automator")
         self.root.geometry("900x700")
         self.config = self.load_config()
+        self.rate_limiter = RateLimiter.from_settings(self.config, state_dir=get_data_dir(self.config))
+        self.namecheap_client = None
+        self.sheets_client = SheetsClient()
         self.setup_ui()
-        self.last_api_call = 0
-        self.spreadsheet = None
-        self.domains_sheet = None
-        self.gsuites_sheet = None
-        self.processed_domains = []
-        self.dmarc_dict = {}
         self.stop_event = Event()
         self.is_running = False
         self.current_operation = None
@@ -130,81 +211,56 @@ class DNSAutomator:
 
     def on_closing(self):
         self.cleanup()
+        if self.namecheap_client:
+            self.namecheap_client.close()
+        self.log_pipeline.close()
         self.root.destroy()
 
-    def get_current_ip(self):
-        """Получает текущий внешний IP адрес"""
-        try:
-            response = requests.get('https://api.ipify.org', timeout=10)
-            return response.text.strip()
-        except:
-            try:
-                response = requests.get('https://ident.me', timeout=10)
-                return response.text.strip()
-            except:
-                return None
-
-    def validate_ip(self, ip):
-        """Проверяет валидность IPv4 адреса"""
-        try:
-            socket.inet_aton(ip)
-            return True
-        except socket.error:
-            return False
-
     def load_config(self):
         """Загружает конфигурацию с обработкой ошибок"""
-        config_path = self.get_config_path()
-        default_config = {
-            "sheet_url": "",
-            "api_user": "",
-            "api_key": "",
-            "username": "",
-            "client_ip": "",
-            "customer_domain": "",
-            "tracking_host": "inst",
-            "tracking_value": "prox.itrackly.com",
-            "spf": "v=spf1 include:_spf.google.com ~all",
-            "mail_enabled": False,
-            "keyfile_path": ""
-        }
-        
-        try:
-            if os.path.exists(config_path):
-                with open(config_path, "r") as f:
-                    return {**default_config, **json.load(f)}
-            return default_config
-        except Exception as e:
-            print(f"Warning: Could not load config: {e}")
-            return default_config
+        return load_config(self.get_config_path())
         
     def get_config_path(self):
         """Возвращает путь к конфигу вне EXE"""
-        if getattr(sys, 'frozen', False):
-            # Если запущен как EXE, сохраняем рядом с EXE
-            exe_dir = os.path.dirname(sys.executable)
-            return os.path.join(exe_dir, "config.json")
-        else:
-            # Если запущен как скрипт, используем локальный файл
-            return "config.json"
+        return get_config_path()
+
+    def get_settings(self):
+        """Собирает текущие настройки из полей формы"""
+        return {
+            **self.config,
+            "sheet_url": self.entry_sheet.get(),
+            "api_user": self.entry_user.get(),
+            "api_key": self.entry_key.get(),
+            "username": self.entry_username.get(),
+            "client_ip": self.entry_ip.get(),
+            "customer_domain": self.entry_customer_domain.get(),
+            "tracking_host": self.entry_tracking_host.get(),
+            "tracking_value": self.entry_tracking_value.get().rstrip('.'),
+            "spf": self.entry_spf.get(),
+            "mail_enabled": self.mail_var.get(),
+            "keyfile_path": self.entry_keyfile.get()
+        }
+
+    def get_client(self):
+        """Возвращает общий на всю сессию клиент Namecheap с пулом соединений"""
+        if self.namecheap_client is None:
+            self.namecheap_client = NamecheapClient.from_settings(self.get_settings())
+        return self.namecheap_client
+
+    def create_engine(self):
+        settings = self.get_settings()
+        if self.force_var.get():
+            settings["skip_converged"] = False
+        return DNSEngine(settings, log=self.log_message,
+                         on_error=self.show_error, stop_event=self.stop_event,
+                         rate_limiter=self.rate_limiter, client=self.get_client(),
+                         sheets_client=self.sheets_client)
 
     def save_config(self):
         """Сохраняет конфигурацию с обработкой ошибок"""
         try:
             config_path = self.get_config_path()
-            config = {
-                "sheet_url": self.entry_sheet.get(),
-                "api_user": self.entry_user.get(),
-                "api_key": self.entry_key.get(),
-                "username": self.entry_username.get(),
-                "client_ip": self.entry_ip.get(),
-                "customer_domain": self.entry_customer_domain.get(),
-                "tracking_host": self.entry_tracking_host.get(),
-                "tracking_value": self.entry_tracking_value.get().rstrip('.'),
-                "spf": self.entry_spf.get(),
-                "mail_enabled": self.mail_var.get(),
-                "keyfile_path": self.entry_keyfile.get()
-            }
+            config = {key: value for key, value in self.get_settings().items() if key not in RUNTIME_SETTINGS}
             
             with open(config_path, "w") as f:
                 json.dump(config, f, indent=2)
@@ -223,9 +279,11 @@ class DNSAutomator:
         self.log_message(f"[ERROR] {title}: {message}")
 
     def log_message(self, message):
-        self.text_output.insert(tk.END, message + "\n")
-        self.text_output.see(tk.END)
-        self.root.update()
+        """Потокобезопасно: строка попадет в виджет при следующей выборке очереди"""
+        self.log_pipeline.put(message)
+
+    def get_log_path(self):
+        return self.config.get("log_file") or os.path.join(get_data_dir(self.config), LOG_FILE)
 
     def toggle_ui_state(self, enabled):
         state = tk.NORMAL if enabled else tk.DISABLED
@@ -244,6 +302,7 @@ class DNSAutomator:
         self.entry_tracking_value.config(state=state)
         self.entry_spf.config(state=state)
         self.chk_mail.config(state=state)
+        self.chk_force.config(state=state)
         self.btn_auto_detect.config(state=state)
         
         if enabled:
@@ -251,7 +310,9 @@ class DNSAutomator:
             self.btn_verify.config(text="Verify All Domains", command=self.verify_all_domains, bg="SystemButtonFace")
             self.btn_run.config(state=tk.NORMAL)
             self.btn_verify.config(state=tk.NORMAL)
+            self.btn_resume.config(state=tk.NORMAL)
         else:
+            self.btn_resume.config(state=tk.DISABLED)
             if self.current_operation == 'setup':
                 self.btn_run.config(text="Stop DNS Setup", command=self.stop_script, bg="#ff6b6b")
                 self.btn_verify.config(state=tk.DISABLED)
@@ -259,24 +320,6 @@ class DNSAutomator:
                 self.btn_verify.config(text="Stop Verification", command=self.stop_script, bg="#ff6b6b")
                 self.btn_run.config(state=tk.DISABLED)
 
-    @staticmethod
-    def validate_domain(domain):
-        if not domain:
-            return False
-        pattern = r'^([a-z0-9]+(-[a-z0-9]+)*\.)+[a-z]{2,}$'
-        return re.match(pattern, domain, re.IGNORECASE) is not None
-
-    @staticmethod
-    def clean_domain_input(domain):
-        domain = (domain or "").strip()
-        if not domain:
-            return ""
-        if domain.startswith(('http://', 'https://')):
-            domain = domain.split('://')[1]
-        domain = domain.split('/')[0].split('?')[0].split('#')[0]
-        domain = domain.split(':')[0]
-        return domain.lower()
-
     def setup_ui(self):
         padx_val = 20
         pady_val = 5
@@ -351,8 +394,15 @@ class DNSAutomator:
 
         self.mail_var = tk.BooleanVar()
         self.mail_var.set(self.config.get("mail_enabled", False))
-        self.chk_mail = tk.Checkbutton(self.root, text="Enable Mail Settings", variable=self.mail_var)
-        self.chk_mail.grid(row=11, column=1, sticky="w", padx=padx_val, pady=pady_val)
+        options_frame = tk.Frame(self.root)
+        options_frame.grid(row=11, column=1, sticky="w", padx=padx_val, pady=pady_val)
+        self.chk_mail = tk.Checkbutton(options_frame, text="Enable Mail Settings", variable=self.mail_var)
+        self.chk_mail.pack(side=tk.LEFT)
+        # Разовая опция запуска, в config.json не сохраняется
+        self.force_var = tk.BooleanVar(value=False)
+        self.chk_force = tk.Checkbutton(options_frame, text="Force re-apply (ignore state cache)",
+                                        variable=self.force_var)
+        self.chk_force.pack(side=tk.LEFT, padx=(20, 0))
 
         button_frame = tk.Frame(self.root)
         button_frame.grid(row=12, column=1, pady=10, sticky="w")
@@ -363,7 +413,9 @@ class DNSAutomator:
         self.btn_run = tk.Button(button_frame, text="Run DNS Setup", command=self.run_script)
         self.btn_run.pack(side=tk.LEFT, padx=(0, 10))
         self.btn_verify = tk.Button(button_frame, text="Verify All Domains", command=self.verify_all_domains)
-        self.btn_verify.pack(side=tk.LEFT)
+        self.btn_verify.pack(side=tk.LEFT, padx=(0, 10))
+        self.btn_resume = tk.Button(button_frame, text="Resume Last Run", command=self.resume_last_run)
+        self.btn_resume.pack(side=tk.LEFT)
 
         self.text_output = scrolledtext.ScrolledText(self.root, width=100, height=25)
         self.text_output.grid(row=13, column=0, columnspan=2, padx=padx_val, pady=10, sticky="nsew")
@@ -374,10 +426,16 @@ class DNSAutomator:
         self.text_output.bind("<Control-v>", lambda e: self.text_output.event_generate("<<Paste>>"))
         self.text_output.bind("<Control-a>", lambda e: (self.text_output.tag_add("sel", "1.0", "end"), "break"))
 
+        self.log_pipeline = LogPipeline(self.root, self.text_output,
+                                        max_lines=int(self.config.get("log_max_lines", DEFAULT_MAX_LINES)),
+                                        log_path=self.get_log_path()).start()
+        if self.log_pipeline.file_error:
+            self.log_message(f"[WARNING] Log file disabled: {self.log_pipeline.file_error}")
+
     def auto_detect_ip(self):
         """Автоматически определяет и устанавливает текущий IP адрес"""
         self.log_message("\n[INFO] Detecting current IP address...")
-        current_ip = self.get_current_ip()
+        current_ip = get_current_ip(self.get_client())
         if current_ip:
             self.entry_ip.delete(0, tk.END)
             self.entry_ip.insert(0, current_ip)
@@ -386,7 +444,8 @@ class DNSAutomator:
             self.log_message("[ERROR] Failed to detect IP address")
 
     def clear_logs(self):
-        self.text_output.delete(1.0, tk.END)
+        """Можно вызывать из любого потока: очистка выполняется в потоке Tk"""
+        self.log_pipeline.clear()
 
     def browse_file(self):
         try:
@@ -406,140 +465,21 @@ class DNSAutomator:
             self.log_message("\n[STOP] Stopping verification process...")
         self.is_running = False
 
-    def get_case_insensitive(self, row, key):
-        for k, v in row.items():
-            if k.lower() == key.lower():
-                return v
-        return ""
-
-    def parse_api_error(self, xml_response):
-        try:
-            namespaces = {'ns': 'http://api.namecheap.com/xml.response'}
-            root = ET.fromstring(xml_response)
-            errors = []
-            for error in root.findall('.//ns:Errors/ns:Error', namespaces):
-                error_number = error.get('Number', '')
-                error_text = error.text or ''
-                errors.append(f"Code {error_number}: {error_text}")
-                
-                # Проверка на код ошибки 1011150
-                if error_number == "1011150" and "Invalid request IP" in error_text:
-                    return "IP_WHITELIST_ERROR"
-                    
-            return "\n".join(errors) if errors else "Unknown API error"
-        except ET.ParseError:
-            return f"Invalid API response: {xml_response[:200]}..."
-
-    def namecheap_api(self, command, params):
-        if self.stop_event.is_set():
-            return None
-            
-        # Проверка IP адреса перед выполнением запроса
-        client_ip = self.entry_ip.get().strip()
-        if not self.validate_ip(client_ip):
-            self.show_error("IP Error", "Invalid IP address format", "Please enter a valid IPv4 address")
-            return None
-            
-        current_time = time.time()
-        elapsed = current_time - self.last_api_call
-        if elapsed < REQUEST_DELAY:
-            sleep_time = REQUEST_DELAY - elapsed
-            self.log_message(f"[PAUSE] Waiting {sleep_time:.1f} seconds before next API call...")
-            time.sleep(sleep_time)
-
-        try:
-            payload = {
-                "ApiUser": self.entry_user.get(),
-                "ApiKey": self.entry_key.get(),
-                "UserName": self.entry_username.get(),
-                "ClientIp": client_ip,
-                "Command": command
-            }
-            payload.update(params)
-            
-            self.log_message(f"\n[API Request] Sending {command} to {BASE_URL}")
-            r = requests.get(BASE_URL, params=payload, timeout=60)
-            r.raise_for_status()
-            self.last_api_call = time.time()
-            
-            # Проверка на ошибку IP адреса в ответе API
-            if "invalid ip address" in r.text.lower():
-                current_real_ip = self.get_current_ip()
-                error_msg = f"IP address mismatch! Configured IP: {client_ip}"
-                if current_real_ip:
-                    error_msg += f", Current real IP: {current_real_ip}"
-                self.show_error("IP Mismatch Error", error_msg)
-                return None
-                
-            # Проверка на ошибку 1011150 (IP не в whitelist)
-            error_parsed = self.parse_api_error(r.text)
-            if error_parsed == "IP_WHITELIST_ERROR":
-                self.show_error("IP Whitelist Error", 
-                              "Your IP address is not whitelisted in Namecheap", 
-                              f"Please add your IP address ({client_ip}) to the Namecheap API whitelist\nDetails: Code 1011150: Invalid request IP")
-                self.stop_event.set()
-                return None
-                
-            self.log_message(f"[API Response] Received {len(r.text)} characters")
-            return r.text
-            
-        except requests.RequestException as e:
-            error_details = f"URL: {BASE_URL}\nCommand: {command}\nParams: {params}"
-            self.show_error("API Communication Error", f"Failed to communicate with Namecheap API:\n{str(e)}", error_details)
-            return None
-        except Exception as e:
-            self.show_error("API Error", f"Unexpected API error:\n{str(e)}")
-            return None
+    def resume_last_run(self):
+        """Продолжает последний прерванный запуск (setup или verify) по журналу"""
+        if self.is_running:
+            messagebox.showwarning("Warning", "Another operation is already in progress.")
+            return
 
-    def get_dns_records(self, domain):
-        try:
-            if not domain:
-                return {"status": "error", "message": "Empty domain"}
-            
-            if not self.validate_domain(domain):
-                return {"status": "error", "message": f"Invalid domain format: {domain}"}
-            
-            sld, tld = domain.split(".", 1)
-            
-            params = {"SLD": sld, "TLD": tld}
-            result = self.namecheap_api("namecheap.domains.dns.getHosts", params)
-            
-            if result is None:
-                return {"status": "error", "message": "API request failed"}
-            
-            namespaces = {'ns': 'http://api.namecheap.com/xml.response'}
-            root = ET.fromstring(result)
-            
-            email_type = "UNKNOWN"
-            domain_result = root.find('.//ns:DomainDNSGetHostsResult', namespaces)
-            if domain_result is not None:
-                email_type = domain_result.get("EmailType", "UNKNOWN")
-            
-            if root.attrib.get("Status") == "OK":
-                records = []
-                for host in root.findall('.//ns:host', namespaces):
-                    record = {
-                        "Type": host.attrib.get("Type"),
-                        "Name": host.attrib.get("Name"),
-                        "Address": host.attrib.get("Address"),
-                        "TTL": host.attrib.get("TTL")
-                    }
-                    records.append(record)
-                
-                return {
-                    "status": "success",
-                    "message": f"{domain} → DNS records retrieved successfully",
-                    "records": records,
-                    "email_type": email_type
-                }
-            else:
-                error_msg = self.parse_api_error(result)
-                return {"status": "error", "message": f"{domain} → API error", "details": error_msg}
-                
-        except Exception as e:
-            return {"status": "error", "message": f"{domain} → Error", "details": str(e)}
+        operation = find_interrupted_operation(self.get_settings())
+        if operation == 'setup':
+            self.run_script(resume=True)
+        elif operation == 'verify':
+            self.verify_all_domains(resume=True)
+        else:
+            messagebox.showinfo("Resume", "There is no interrupted run to resume.")
 
-    def verify_all_domains(self):
+    def verify_all_domains(self, resume=False):
         if self.is_running:
             messagebox.showwarning("Warning", "Another operation is already in progress.")
             return
@@ -548,70 +488,20 @@ class DNSAutomator:
         self.log_message("=== Starting Verification for All Domains ===")
         
         self.current_operation = 'verify'
-        self.current_thread = Thread(target=self._verify_all_domains_thread)
+        self.current_thread = Thread(target=self._verify_all_domains_thread, args=(resume,))
         self.current_thread.daemon = True
         self.current_thread.start()
 
-    def _verify_all_domains_thread(self):
+    def _verify_all_domains_thread(self, resume=False):
         self.is_running = True
         self.stop_event.clear()
         self.toggle_ui_state(False)
         self.verification_results = {}
         
         try:
-            self.log_message("\n[Google Sheets] Initializing connection...")
-            scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-            creds = ServiceAccountCredentials.from_json_keyfile_name(self.entry_keyfile.get(), scope)
-            client = gspread.authorize(creds)
-            
-            self.log_message(f"[Google Sheets] Opening spreadsheet: {self.entry_sheet.get()}")
-            self.spreadsheet = client.open_by_url(self.entry_sheet.get())
-            
-            try:
-                self.gsuites_sheet = self.spreadsheet.worksheet("G-Suites")
-                gsuites_rows = self.gsuites_sheet.get_all_records()
-                self.dmarc_dict = {}
-                
-                for row in gsuites_rows:
-                    if self.stop_event.is_set():
-                        break
-                    domain = self.clean_domain_input(self.get_case_insensitive(row, "Domain"))
-                    dmarc = self.get_case_insensitive(row, "DMARC")
-                    if domain and dmarc:
-                        domain_lower = domain.lower()
-                        if domain_lower not in self.dmarc_dict:
-                            self.dmarc_dict[domain_lower] = []
-                        if dmarc.strip():
-                            self.dmarc_dict[domain_lower].append(dmarc.strip())
-                
-            except Exception as e:
-                self.log_message(f"[WARNING] Failed to read G-Suites sheet: {str(e)}")
-            
-            try:
-                self.domains_sheet = self.spreadsheet.worksheet("Domains")
-                domains_rows = self.domains_sheet.get_all_records()
-                if not domains_rows:
-                    raise ValueError("No domains found in Domains sheet")
-            except Exception as e:
-                raise ValueError(f"Failed to read Domains sheet: {str(e)}")
-            
-            domains_to_verify = []
-            for row in domains_rows:
-                if self.stop_event.is_set():
-                    self.log_message("\n[STOPPED] Verification process stopped by user")
-                    break
-                    
-                domain = self.clean_domain_input(self.get_case_insensitive(row, "Domain"))
-                if domain and self.validate_domain(domain):
-                    customer_domain = self.entry_customer_domain.get().strip()
-                    redirect_url = f"{customer_domain}?utm_medium=domain_redirect&utm_source=email_outreach&utm_campaign={domain}"
-                    domains_to_verify.append({
-                        'domain': domain,
-                        'redirect_url': redirect_url
-                    })
-            
-            self.processed_domains = domains_to_verify
-            self.verify_dns_settings_for_all_domains()
+            engine = self.create_engine()
+            self.verification_results = engine.verification_results
+            engine.run_verify(resume=resume)
             
         except Exception as e:
             self.show_error("Verification Error", f"Failed to verify domains: {str(e)}")
@@ -622,316 +512,36 @@ class DNSAutomator:
             
             # Показываем результаты только если процесс не был остановлен на этапе setup
             if self.verification_results and self.current_operation != 'setup':
-                ResultsWindow(self.root, self.verification_results, "verification")
+                ResultsWindow(self.root, self.verification_results, "verification", engine.metrics.summary())
 
-    def verify_dns_settings_for_all_domains(self):
-        if not self.processed_domains:
-            self.log_message("No domains to verify!")
-            return
-            
-        self.log_message(f"\n=== Starting DNS Verification for {len(self.processed_domains)} domains ===")
-        
-        for domain_info in self.processed_domains:
-            if self.stop_event.is_set():
-                self.log_message("\n[STOPPED] Verification process stopped by user")
-                break
-                
-            domain = domain_info['domain']
-            redirect_url = domain_info['redirect_url']
-            
-            self.log_message(f"\n[VERIFICATION] Checking DNS records for {domain}...")
-            
-            result = self.get_dns_records(domain)
-            if result["status"] != "success":
-                self.log_message(f"[VERIFICATION FAILED] {domain}: {result['message']}")
-                self.verification_results[domain] = {
-                    "Redirect": False, "Tracking": False, "SPF": False, 
-                    "DMARC": False, "Mail Settings": False
-                }
-                continue
-            
-            actual_records = result["records"]
-            email_type = result.get("email_type", "UNKNOWN")
-            
-            verification_results = {
-                "Redirect": False, "Tracking": False, "SPF": False, 
-                "DMARC": False, "Mail Settings": False
-            }
-            
-            mail_settings_ok = email_type == "GMAIL" and self.mail_var.get()
-            verification_results["Mail Settings"] = mail_settings_ok
-            
-            if not mail_settings_ok:
-                self.log_message(f"[MAIL SETTINGS ERROR] Expected GMAIL, got: {email_type}")
-            
-            # Проверка URL redirect
-            for record in actual_records:
-                if (record["Type"] == "URL301" and record["Name"] in ("@", "") and 
-                    redirect_url in record["Address"]):
-                    verification_results["Redirect"] = True
-                    break
-            
-            # Проверка CNAME
-            tracking_host = self.entry_tracking_host.get().lower()
-            tracking_value = self.entry_tracking_value.get().rstrip('.').lower()
-            if tracking_host and tracking_value:
-                for record in actual_records:
-                    if (record["Type"] == "CNAME" and record["Name"].lower() == tracking_host and 
-                        record["Address"].rstrip('.').lower() == tracking_value):
-                        verification_results["Tracking"] = True
-                        break
-            
-            # Проверка SPF
-            spf = self.entry_spf.get()
-            if spf:
-                for record in actual_records:
-                    if (record["Type"] == "TXT" and record["Name"] in ("@", "") and 
-                        spf in record["Address"].replace('"', '')):
-                        verification_results["SPF"] = True
-                        break
-            
-            # Проверка DMARC
-            expected_dmarc_records = self.dmarc_dict.get(domain.lower(), [])
-            actual_dmarc_records = []
-            
-            for record in actual_records:
-                if record["Type"] == "TXT" and record["Name"] == "_dmarc":
-                    actual_dmarc_records.append(record["Address"].strip().replace('"', ''))
-            
-            if len(actual_dmarc_records) == len(expected_dmarc_records):
-                all_dmarc_correct = True
-                for expected_dmarc in expected_dmarc_records:
-                    expected_clean = expected_dmarc.strip().replace('"', '')
-                    found = False
-                    for actual_dmarc in actual_dmarc_records:
-                        if expected_clean.lower() == actual_dmarc.lower():
-                            found = True
-                            break
-                    if not found:
-                        all_dmarc_correct = False
-                        break
-                verification_results["DMARC"] = all_dmarc_correct
-            
-            self.verification_results[domain] = verification_results
-            
-            try:
-                all_data = self.domains_sheet.get_all_values()
-                headers = all_data[0]
-                
-                for i, row in enumerate(all_data[1:], start=2):
-                    if len(row) > 0 and row[0].lower() == domain.lower():
-                        for col_name, value in verification_results.items():
-                            try:
-                                col_index = headers.index(col_name)
-                                cell_value = "TRUE" if value else "FALSE"
-                                self.domains_sheet.update_cell(i, col_index + 1, cell_value)
-                            except ValueError:
-                                continue
-                
-                self.log_message(f"[VERIFICATION SUCCESS] {domain} → Sheet updated")
-                
-            except Exception as e:
-                self.log_message(f"[VERIFICATION ERROR] {domain} → Failed to update sheet: {str(e)}")
-            
-            if domain != self.processed_domains[-1]['domain'] and not self.stop_event.is_set():
-                for i in range(REQUEST_DELAY):
-                    if self.stop_event.is_set():
-                        break
-                    time.sleep(1)
-        
-        self.log_message("\n=== DNS Verification Complete ===")
-
-    def update_dns(self, domain, redirect_url, dmarc_records):
-        try:
-            if not domain or not self.validate_domain(domain):
-                return {"status": "error", "message": "Invalid domain"}
-            
-            sld, tld = domain.split(".", 1)
-            hosts = []
-
-            hosts.append({"Type": "URL301", "Name": "@", "Address": redirect_url})
-
-            tracking_host = self.entry_tracking_host.get()
-            tracking_value = self.entry_tracking_value.get().rstrip('.')
-            if tracking_host and tracking_value:
-                hosts.append({"Type": "CNAME", "Name": tracking_host, "Address": tracking_value})
-
-            spf = self.entry_spf.get()
-            if spf:
-                hosts.append({"Type": "TXT", "Name": "@", "Address": spf})
-
-            for dmarc in dmarc_records:
-                if dmarc:
-                    hosts.append({"Type": "TXT", "Name": "_dmarc", "Address": dmarc})
-
-            params = {"SLD": sld, "TLD": tld, "EmailType": "Gmail"}
-            
-            for i, h in enumerate(hosts, 1):
-                params[f"HostName{i}"] = h["Name"]
-                params[f"RecordType{i}"] = h["Type"]
-                params[f"Address{i}"] = h["Address"]
-
-            self.log_message(f"\n[DNS Update] Processing {domain} with {len(hosts)} records...")
-            result = self.namecheap_api("namecheap.domains.dns.setHosts", params)
-            
-            if result is None:
-                return {"status": "error", "message": "API request failed"}
-            
-            namespaces = {'ns': 'http://api.namecheap.com/xml.response'}
-            root = ET.fromstring(result)
-            
-            if root.attrib.get("Status") == "OK":
-                self.processed_domains.append({'domain': domain, 'redirect_url': redirect_url})
-                return {"status": "success", "message": f"{domain} → DNS updated successfully"}
-            else:
-                error_msg = self.parse_api_error(result)
-                return {"status": "error", "message": f"{domain} → API error", "details": error_msg}
-                
-        except Exception as e:
-            return {"status": "error", "message": f"{domain} → Error", "details": str(e)}
-
-    def run_script(self):
+    def run_script(self, resume=False):
         if self.is_running:
             messagebox.showwarning("Warning", "Another operation is already in progress.")
             return
             
         self.current_operation = 'setup'
-        self.current_thread = Thread(target=self._run_script_thread)
+        self.current_thread = Thread(target=self._run_script_thread, args=(resume,))
         self.current_thread.daemon = True
         self.current_thread.start()
 
-    def _run_script_thread(self):
+    def _run_script_thread(self, resume=False):
         self.is_running = True
         self.stop_event.clear()
         self.toggle_ui_state(False)
         self.clear_logs()
         self.log_message("=== Starting DNS Setup ===")
-        self.processed_domains = []
+        self.verification_results = {}
         
         try:
-            required_fields = {
-                "Google Sheet URL": self.entry_sheet.get(),
-                "API User": self.entry_user.get(),
-                "API Key": self.entry_key.get(),
-                "Username": self.entry_username.get(),
-                "Client IP": self.entry_ip.get(),
-                "Customer Domain": self.entry_customer_domain.get(),
-                "Service Account JSON": self.entry_keyfile.get()
-            }
-            
-            missing_fields = [field for field, value in required_fields.items() if not value]
-            if missing_fields:
-                raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
-            
-            customer_domain = self.entry_customer_domain.get().strip()
-            
-            self.log_message("\n[Google Sheets] Initializing connection...")
-            scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-            creds = ServiceAccountCredentials.from_json_keyfile_name(self.entry_keyfile.get(), scope)
-            client = gspread.authorize(creds)
-            
-            self.log_message(f"[Google Sheets] Opening spreadsheet: {self.entry_sheet.get()}")
-            self.spreadsheet = client.open_by_url(self.entry_sheet.get())
-            
-            try:
-                self.gsuites_sheet = self.spreadsheet.worksheet("G-Suites")
-                gsuites_rows = self.gsuites_sheet.get_all_records()
-                self.dmarc_dict = {}
-                
-                for row in gsuites_rows:
-                    if self.stop_event.is_set():
-                        break
-                    domain = self.clean_domain_input(self.get_case_insensitive(row, "Domain"))
-                    dmarc = self.get_case_insensitive(row, "DMARC")
-                    if domain and dmarc:
-                        domain_lower = domain.lower()
-                        if domain_lower not in self.dmarc_dict:
-                            self.dmarc_dict[domain_lower] = []
-                        if dmarc.strip():
-                            self.dmarc_dict[domain_lower].append(dmarc.strip())
-                
-            except Exception as e:
-                raise ValueError(f"Failed to read G-Suites sheet: {str(e)}")
-            
-            try:
-                self.domains_sheet = self.spreadsheet.worksheet("Domains")
-                domains_rows = self.domains_sheet.get_all_records()
-                if not domains_rows:
-                    raise ValueError("No domains found in Domains sheet")
-            except Exception as e:
-                raise ValueError(f"Failed to read Domains sheet: {str(e)}")
-            
-            results = []
-            for i, row in enumerate(domains_rows, 1):
-                try:
-                    if self.stop_event.is_set():
-                        self.log_message("\n[STOPPED] Process stopped by user")
-                        break
-                        
-                    domain = self.clean_domain_input(self.get_case_insensitive(row, "Domain"))
-                    if not domain:
-                        results.append(f"Row {i} → ERROR: Empty domain value")
-                        continue
-                    
-                    if not self.validate_domain(domain):
-                        results.append(f"Row {i} → ERROR: Invalid domain format: {domain}")
-                        continue
-                    
-                    current_redirect = f"{customer_domain}?utm_medium=domain_redirect&utm_source=email_outreach&utm_campaign={domain}"
-                    dmarc_records = self.dmarc_dict.get(domain.lower(), [])
-                    
-                    self.log_message(f"\nProcessing {i}/{len(domains_rows)}: {domain}")
-                    self.log_message(f"Redirect URL: {current_redirect}")
-                    
-                    if self.mail_var.get():
-                        self.log_message("Mail settings enabled")
-                    
-                    result = self.update_dns(domain, current_redirect, dmarc_records)
-                    
-                    if result["status"] == "success":
-                        results.append(result["message"])
-                    else:
-                        error_msg = f"{result['message']}"
-                        if "details" in result:
-                            error_msg += f"\nDetails: {result['details']}"
-                        results.append(error_msg)
-                        self.log_message(f"[ERROR] {error_msg}")
-                    
-                    if i < len(domains_rows) and not self.stop_event.is_set():
-                        for j in range(REQUEST_DELAY):
-                            if self.stop_event.is_set():
-                                break
-                            time.sleep(1)
-                            
-                except Exception as e:
-                    error_msg = f"Row {i} → ERROR: {str(e)}"
-                    results.append(error_msg)
-                    self.log_message(error_msg)
-                    continue
+            engine = self.create_engine()
+            self.verification_results = engine.verification_results
+            engine.run_setup(resume=resume)
             
             if not self.stop_event.is_set():
-                self.log_message("\n=== DNS Setup Complete ===")
-                
-                if self.processed_domains:
-                    self.log_message(f"\n[INFO] Waiting {DNS_PROPAGATION_DELAY} seconds for DNS propagation...")
-                    for i in range(DNS_PROPAGATION_DELAY):
-                        if self.stop_event.is_set():
-                            break
-                        time.sleep(1)
-                    
-                    if not self.stop_event.is_set():
-                        self.verify_dns_settings_for_all_domains()
-                        # Не показываем результаты при остановке на этапе setup
-                        if self.verification_results and not self.stop_event.is_set():
-                            ResultsWindow(self.root, self.verification_results, "setup")
-                
-                self.log_message("\n=== Operation Complete ===")
-                self.save_config()
-            else:
-                self.log_message("\n=== Operation Stopped ===")
                 # Не показываем результаты при остановке на этапе setup
-                if self.verification_results and self.current_operation != 'setup':
-                    ResultsWindow(self.root, self.verification_results, "setup")
+                if self.verification_results:
+                    ResultsWindow(self.root, self.verification_results, "setup", engine.metrics.summary())
+                self.save_config()
             
         except Exception as e:
             self.show_error("Script Error", f"Failed to execute script: {str(e)}")
@@ -940,7 +550,59 @@ class DNSAutomator:
             self.current_operation = None
             self.toggle_ui_state(True)
 
-if __name__ == "__main__":
+# Модули, которые импортируются при первом использовании, а не при старте GUI,
+# чтобы окно появлялось быстрее (замеряются в --profile-startup)
+DEFERRED_MODULES = ("requests", "xml.etree.ElementTree", "oauth2client.service_account", "gspread")
+STARTUP_PROFILE_FILE = "startup_profile.txt"
+
+
+def profile_startup():
+    """Время до первой отрисовки окна и время импорта отложенных модулей.
+
+    Отчет пишется в STARTUP_PROFILE_FILE рядом с конфигом: в оконной
+    сборке (--noconsole) sys.stdout равен None и print ничего не покажет.
+    """
+    modules_ready = time.perf_counter()
     root = tk.Tk()
     app = DNSAutomator(root)
-    root.mainloop()
+    root.update()
+    first_paint = time.perf_counter()
+
+    lines = [
+        f"App modules imported:  {(modules_ready - STARTUP_STARTED) * 1000:8.1f} ms",
+        f"Window built:          {(first_paint - modules_ready) * 1000:8.1f} ms",
+        f"Time to first paint:   {(first_paint - STARTUP_STARTED) * 1000:8.1f} ms",
+        "",
+        "Deferred imports (paid by the first operation):"
+    ]
+    for name in DEFERRED_MODULES:
+        if name in sys.modules:
+            lines.append(f"  {name:32} already loaded at startup")
+            continue
+        started = time.perf_counter()
+        importlib.import_module(name)
+        lines.append(f"  {name:32} {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    report = "\n".join(lines)
+    path = os.path.join(get_data_dir(app.config), STARTUP_PROFILE_FILE)
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+        report += f"\n\nSaved to {path}"
+    except OSError as e:
+        report += f"\n\nFailed to save {path}: {e}"
+    if sys.stdout is not None:
+        print(report)
+    else:
+        messagebox.showinfo("Startup Profile", report)
+
+    app.on_closing()
+
+
+if __name__ == "__main__":
+    if "--profile-startup" in sys.argv[1:]:
+        profile_startup()
+    else:
+        root = tk.Tk()
+        app = DNSAutomator(root)
+        root.mainloop()
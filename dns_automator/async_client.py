@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""asyncio версия вызовов Namecheap API.
+
+Один event loop ведет сотни одновременных getHosts/setHosts без потока на
+запрос. Сборка запросов и разбор ответов общие с DNSEngine, поэтому
+результаты совпадают с синхронным путем один в один.
+
+Замер пропускной способности без сети (против fake_namecheap):
+
+    python async_client.py --domains 1000 --in-flight 200
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+from engine import (API_LATENCY, APPLY_DIFF, DNSEngine, build_hosts, get_current_ip, get_hosts_params,
+                    get_hosts_result, set_hosts_params, set_hosts_result, validate_domain)
+from namecheap import (BASE_URL, DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_SIZE, DEFAULT_READ_TIMEOUT,
+                       NamecheapResponse)
+
+DEFAULT_MAX_IN_FLIGHT = 200
+STOP_POLL_INTERVAL = 0.2
+
+
+class RunStopped(Exception):
+    """Поднимается внутри TaskGroup, чтобы отменить все задачи запуска"""
+
+
+class AsyncNamecheapClient:
+    """Асинхронный аналог NamecheapClient на aiohttp.
+
+    Используется как async context manager: сессия и пул соединений
+    живут в пределах одного event loop.
+    """
+
+    def __init__(self, api_user="", api_key="", username="", client_ip="", base_url=BASE_URL,
+                 pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.api_user = api_user
+        self.api_key = api_key
+        self.username = username
+        self.client_ip = client_ip
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=read_timeout)
+        self.session = None
+
+    @classmethod
+    def from_settings(cls, settings, pool_size=None):
+        return cls(api_user=settings.get("api_user", ""),
+                   api_key=settings.get("api_key", ""),
+                   username=settings.get("username", ""),
+                   client_ip=settings.get("client_ip", "").strip(),
+                   base_url=settings.get("api_base_url") or BASE_URL,
+                   pool_size=pool_size or int(settings.get("http_pool_size") or DEFAULT_POOL_SIZE),
+                   connect_timeout=float(settings.get("connect_timeout") or DEFAULT_CONNECT_TIMEOUT),
+                   read_timeout=float(settings.get("read_timeout") or DEFAULT_READ_TIMEOUT))
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.pool_size)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+
+    async def call(self, command, params):
+        payload = {
+            "ApiUser": self.api_user,
+            "ApiKey": self.api_key,
+            "UserName": self.username,
+            "ClientIp": self.client_ip,
+            "Command": command
+        }
+        payload.update(params)
+
+        async with self.session.get(self.base_url, params=payload) as r:
+            r.raise_for_status()
+            return await r.text()
+
+
+class AsyncDNSEngine(DNSEngine):
+    """DNSEngine, у которого фаза вызовов API идет через asyncio.
+
+    apply_jobs и iter_dns_records запускают все домены в одном event loop
+    внутри asyncio.TaskGroup; число запросов в полете ограничивает
+    async_max_in_flight, темп - общий rate_limiter. stop_event или
+    ошибка whitelist отменяют всю группу целиком.
+    """
+
+    def __init__(self, settings, **kwargs):
+        super().__init__(settings, **kwargs)
+        self.max_in_flight = max(1, int(self.settings.get("async_max_in_flight") or DEFAULT_MAX_IN_FLIGHT))
+        self.async_client = None
+
+    async def namecheap_api_async(self, command, params):
+        API_LATENCY.set(None)
+        if self.stop_event.is_set():
+            raise RunStopped()
+
+        client_ip = self.check_client_ip()
+        if client_ip is None:
+            return None
+
+        await self.rate_limiter.acquire_async(self.on_rate_limit_wait)
+
+        try:
+            self.log_message(f"\n[API Request] Sending {command} to {self.async_client.base_url}")
+            started = time.perf_counter()
+            text = await self.async_client.call(command, params)
+            API_LATENCY.set(time.perf_counter() - started)
+            self.metrics.record_latency(API_LATENCY.get())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error_details = f"URL: {self.async_client.base_url}\nCommand: {command}\nParams: {params}"
+            self.show_error("API Communication Error", f"Failed to communicate with Namecheap API:\n{str(e)}", error_details)
+            return None
+
+        response = NamecheapResponse.parse(text)
+        if response.ip_mismatch:
+            # get_current_ip блокирует, поэтому выполняется вне event loop
+            self.report_ip_mismatch(client_ip, await asyncio.to_thread(get_current_ip, self.client))
+            response = None
+        else:
+            response = self.check_api_response(response, client_ip)
+        if response is None and self.stop_event.is_set():
+            raise RunStopped()
+        return response
+
+    async def get_dns_records_async(self, domain):
+        try:
+            if not domain:
+                return {"status": "error", "message": "Empty domain"}
+
+            if not validate_domain(domain):
+                return {"status": "error", "message": f"Invalid domain format: {domain}"}
+
+            response = await self.namecheap_api_async("namecheap.domains.dns.getHosts", get_hosts_params(domain))
+
+            if response is None:
+                return {"status": "error", "message": "API request failed", "latency": API_LATENCY.get()}
+
+            return {**get_hosts_result(domain, response), "latency": API_LATENCY.get()}
+
+        except RunStopped:
+            raise
+        except Exception as e:
+            return {"status": "error", "message": f"{domain} → Error", "details": str(e)}
+
+    async def update_dns_async(self, domain, redirect_url, dmarc_records):
+        try:
+            if not domain or not validate_domain(domain):
+                return {"status": "error", "message": "Invalid domain"}
+
+            hosts = build_hosts(self.settings, redirect_url, dmarc_records)
+
+            diff = None
+            read_latency = 0
+            if self.apply_mode() == APPLY_DIFF:
+                current = await self.get_dns_records_async(domain)
+                diff = self.current_diff(hosts, current)
+                unchanged = self.check_unchanged(domain, diff, current)
+                if unchanged:
+                    return unchanged
+                read_latency = current.get("latency") or 0
+
+            self.log_message(f"\n[DNS Update] Processing {domain} with {len(hosts)} records...")
+            response = await self.namecheap_api_async("namecheap.domains.dns.setHosts", set_hosts_params(domain, hosts))
+            latency = read_latency + (API_LATENCY.get() or 0)
+
+            if response is None:
+                return {"status": "error", "message": "API request failed", "diff": diff, "latency": latency}
+
+            return {**set_hosts_result(domain, response), "diff": diff, "latency": latency}
+
+        except RunStopped:
+            raise
+        except Exception as e:
+            return {"status": "error", "message": f"{domain} → Error", "details": str(e)}
+
+    async def setup_domain_async(self, job, total):
+        i, domain, current_redirect, dmarc_records, _ = job
+        self.log_message(f"\nProcessing {i}/{total}: {domain}")
+        result = await self.update_dns_async(domain, current_redirect, dmarc_records)
+        self.export_result("setup", domain, result)
+
+        if result["status"] == "success":
+            return True, result["message"]
+
+        error_msg = f"{result['message']}"
+        if "details" in result:
+            error_msg += f"\nDetails: {result['details']}"
+        self.log_message(f"[ERROR] {error_msg}")
+        return False, error_msg
+
+    async def watch_stop_event(self):
+        while not self.stop_event.is_set():
+            await asyncio.sleep(STOP_POLL_INTERVAL)
+        raise RunStopped()
+
+    async def run_ordered(self, items, make_coro):
+        """Выполняет make_coro(item) для всех items; результаты в порядке items.
+
+        Для задач, не успевших завершиться до остановки, результат None.
+        """
+        results = [None] * len(items)
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def run_one(index, item):
+            async with semaphore:
+                results[index] = await make_coro(item)
+
+        async with AsyncNamecheapClient.from_settings(self.settings, pool_size=self.max_in_flight) as client:
+            self.async_client = client
+            try:
+                async with asyncio.TaskGroup() as group:
+                    watcher = group.create_task(self.watch_stop_event())
+                    tasks = [group.create_task(run_one(index, item)) for index, item in enumerate(items)]
+                    await asyncio.gather(*tasks)
+                    watcher.cancel()
+            except* RunStopped:
+                self.stop_event.set()
+            finally:
+                self.async_client = None
+        return results
+
+    def apply_jobs(self, jobs, total, concurrency):
+        results = asyncio.run(self.run_ordered(jobs, lambda job: self.setup_domain_async(job, total)))
+        if self.stop_event.is_set():
+            self.log_message("\n[STOPPED] Process stopped by user")
+        for job, result in zip(jobs, results):
+            if result is not None:
+                yield job, result
+
+    def iter_dns_records(self, domains):
+        self.log_message(f"\n[VERIFICATION] Fetching DNS records for {len(domains)} domains...")
+        results = asyncio.run(self.run_ordered(domains, lambda info: self.get_dns_records_async(info['domain'])))
+        for domain_info, result in zip(domains, results):
+            if result is not None:
+                yield domain_info, result
+
+
+def main(argv=None):
+    from fake_namecheap import FakeNamecheapServer
+
+    parser = argparse.ArgumentParser(description="Async client throughput against the local stand-in")
+    parser.add_argument("--domains", type=int, default=1000)
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    args = parser.parse_args(argv)
+
+    with FakeNamecheapServer() as server:
+        settings = {
+            "api_user": "bench", "api_key": "bench", "username": "bench", "client_ip": "127.0.0.1",
+            "customer_domain": "https://example.com/", "api_base_url": server.url,
+            "async_max_in_flight": args.in_flight,
+            # Без квот: меряем сам клиент, а не лимитер
+            "api_rate_per_minute": 0, "api_rate_per_hour": 0, "api_rate_per_day": 0
+        }
+        engine = AsyncDNSEngine(settings, log=lambda message: None)
+        jobs = [(i, f"bench{i}.com", f"https://example.com/?utm_campaign=bench{i}.com", [], None)
+                for i in range(1, args.domains + 1)]
+
+        started = time.perf_counter()
+        applied = sum(success for _, (success, _) in engine.apply_jobs(jobs, len(jobs), args.in_flight))
+        setup_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        fetched = sum(result["status"] == "success"
+                      for _, result in engine.iter_dns_records([{"domain": job[1]} for job in jobs]))
+        verify_time = time.perf_counter() - started
+
+    print(f"setHosts: {applied}/{len(jobs)} in {setup_time:.2f}s ({len(jobs) / setup_time:.0f} calls/s)")
+    print(f"getHosts: {fetched}/{len(jobs)} in {verify_time:.2f}s ({len(jobs) / verify_time:.0f} calls/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Сквозной замер пропускной способности setup+verify на синтетических таблицах.
+
+Для каждого размера таблицы поднимает fake_namecheap и FakeSpreadsheet,
+прогоняет run_setup (с ожиданием распространения) и затем run_verify
+тем же движком, что и GUI, и сохраняет метрики в JSON, чтобы сравнивать
+изменения конвейера от запуска к запуску:
+
+    python benchmark.py --sizes 100 1000 10000 --output benchmark_results.json
+    python benchmark.py --sizes 1000 --latency 0.2 --concurrency 8 --async
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from threading import Event, Lock
+
+from engine import (APPLY_ALWAYS, APPLY_DIFF, DEFAULT_CONFIG, VERIFY_API, VERIFY_DNS, DNSEngine)
+from fake_dns import FakeDNSServer, namecheap_zone
+from fake_namecheap import FakeNamecheapServer, FakeNamecheapState
+from fake_sheets import FakeSheetsClient, FakeSpreadsheet
+from ratelimit import RateLimiter
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+
+class TimedEvent(Event):
+    """Event, который суммирует время, проведенное в wait() во всех потоках"""
+
+    def __init__(self):
+        super().__init__()
+        self.waited = 0.0
+        self.wait_lock = Lock()
+
+    def wait(self, timeout=None):
+        started = time.perf_counter()
+        try:
+            return super().wait(timeout)
+        finally:
+            with self.wait_lock:
+                self.waited += time.perf_counter() - started
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса; None там, где нет модуля resource (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def bench_settings(args, api_url, workdir):
+    settings = dict(DEFAULT_CONFIG)
+    settings.update({
+        "sheet_url": "https://docs.google.com/spreadsheets/d/benchmark",
+        "api_user": "bench", "api_key": "bench", "username": "bench", "client_ip": "127.0.0.1",
+        "customer_domain": "https://example.com/",
+        "keyfile_path": "benchmark.json",
+        "mail_enabled": True,
+        "api_base_url": api_url,
+        "api_rate_per_minute": args.rate_per_minute,
+        "api_rate_per_hour": args.rate_per_hour,
+        "api_rate_per_day": args.rate_per_day,
+        "api_burst": args.burst or args.rate_per_minute,
+        "concurrency": args.concurrency,
+        "async_max_in_flight": args.concurrency,
+        "apply_mode": args.apply_mode,
+        "verify_method": args.verify_method,
+        "propagation_initial_interval": args.propagation_interval,
+        "state_cache_path": os.path.join(workdir, "dns_state.sqlite3"),
+        "journal_dir": workdir,
+        "snapshot_dir": workdir,
+        "metrics_dir": workdir,
+        "results_export_path": ""
+    })
+    return settings
+
+
+class Counters:
+    """Снимок счетчиков fake серверов и процесса между фазами"""
+
+    def __init__(self, state, spreadsheet, stop_event, rate_limiter):
+        stats = state.stats()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.calls = stats["calls"]
+        self.failures = stats["failures"]
+        self.sheets = dict(spreadsheet.counters)
+        self.event_wait = stop_event.waited
+        self.rate_limit_wait = rate_limiter.total_wait
+
+
+def delta(after, before):
+    return {key: value - before.get(key, 0) for key, value in after.items() if value - before.get(key, 0)}
+
+
+def phase_metrics(before, after, size, use_async):
+    wall = after.wall - before.wall
+    calls = delta(after.calls, before.calls)
+    rate_limit_wait = after.rate_limit_wait - before.rate_limit_wait
+    # Синхронный лимитер ждет через stop_event.wait, async - через asyncio.sleep
+    event_wait = after.event_wait - before.event_wait
+    propagation_wait = event_wait if use_async else max(0.0, event_wait - rate_limit_wait)
+    sheets = delta(after.sheets, before.sheets)
+    return {
+        "wall_s": round(wall, 3),
+        "cpu_s": round(after.cpu - before.cpu, 3),
+        "domains_per_minute": round(size / wall * 60, 1) if wall else None,
+        "api_calls": calls,
+        "api_calls_per_domain": round(sum(calls.values()) / size, 3),
+        "injected_failures": delta(after.failures, before.failures),
+        "sheets_reads_per_domain": round(sheets.get("reads", 0) / size, 4),
+        "sheets_writes_per_domain": round(sheets.get("writes", 0) / size, 4),
+        "drive_calls": sheets.get("drive_calls", 0),
+        # Сумма по всем потокам, поэтому может превышать wall_s
+        "sleep_s": {"rate_limit": round(rate_limit_wait, 3), "propagation": round(propagation_wait, 3)}
+    }
+
+
+def run_size(size, args):
+    engine_class = DNSEngine
+    if args.use_async:
+        from async_client import AsyncDNSEngine
+        engine_class = AsyncDNSEngine
+
+    spreadsheet = FakeSpreadsheet.synthetic(size)
+    state = FakeNamecheapState(latency=args.latency, jitter=args.jitter, rate_limit=args.fake_rate_limit,
+                               rate_period=args.fake_rate_period, http_error_rate=args.http_error_rate,
+                               api_error_rate=args.api_error_rate, seed=args.seed)
+    log = (lambda message: print(message, flush=True)) if args.verbose else (lambda message: None)
+
+    with tempfile.TemporaryDirectory() as workdir, FakeNamecheapServer(state=state) as server:
+        settings = bench_settings(args, server.url, workdir)
+        dns_server = None
+        if args.verify_method == VERIFY_DNS:
+            dns_server = FakeDNSServer(namecheap_zone(state)).start()
+            settings["dns_server"], settings["dns_port"] = dns_server.address
+
+        stop_event = TimedEvent()
+        rate_limiter = RateLimiter.from_settings(settings)
+        engine = engine_class(settings, log=log, stop_event=stop_event, rate_limiter=rate_limiter,
+                              sheets_client=FakeSheetsClient(spreadsheet))
+        if args.trace_memory:
+            tracemalloc.start()
+        try:
+            started = Counters(state, spreadsheet, stop_event, rate_limiter)
+            engine.run_setup()
+            setup_done = Counters(state, spreadsheet, stop_event, rate_limiter)
+            setup_phases = engine.metrics.summary()
+            engine.run_verify()
+            verify_done = Counters(state, spreadsheet, stop_event, rate_limiter)
+            verify_phases = engine.metrics.summary()
+            traced_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+        finally:
+            if args.trace_memory:
+                tracemalloc.stop()
+            if dns_server is not None:
+                dns_server.stop()
+
+    verified = sum(all(checks.values()) for checks in engine.verification_results.values())
+    return {
+        "domains": size,
+        "verified": verified,
+        "setup": {**phase_metrics(started, setup_done, size, args.use_async), "engine": setup_phases},
+        "verify": {**phase_metrics(setup_done, verify_done, size, args.use_async), "engine": verify_phases},
+        "total": phase_metrics(started, verify_done, size, args.use_async),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_traced_mb": round(traced_peak / (1024 * 1024), 1) if traced_peak is not None else None
+    }
+
+
+def run_isolated(size, args):
+    """run_size в отдельном процессе: ru_maxrss - максимум за всю жизнь процесса,
+    поэтому иначе каждый следующий размер показывал бы пик предыдущих"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_size, size, args).result()
+
+
+def print_run(run):
+    total = run["total"]
+    print(f"{run['domains']:>6} domains: {total['domains_per_minute']:>9} domains/min, "
+          f"{total['wall_s']:>8.2f}s wall, {total['cpu_s']:>8.2f}s cpu, "
+          f"{total['api_calls_per_domain']:.2f} API calls/domain, "
+          f"{total['sheets_reads_per_domain']:.4f} reads + {total['sheets_writes_per_domain']:.4f} writes/domain, "
+          f"verified {run['verified']}/{run['domains']}, peak RSS {run['peak_rss_mb']} MB", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end setup+verify benchmark against local fakes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file for the results")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="use AsyncDNSEngine")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONFIG["concurrency"])
+    parser.add_argument("--apply-mode", choices=[APPLY_ALWAYS, APPLY_DIFF], default=APPLY_ALWAYS)
+    parser.add_argument("--verify-method", choices=[VERIFY_API, VERIFY_DNS], default=VERIFY_API)
+    parser.add_argument("--propagation-interval", type=float, default=1.0,
+                        help="seconds before re-checking a domain that is not propagated yet")
+    parser.add_argument("--rate-per-minute", type=int, default=0, help="client rate limit (0 = off)")
+    parser.add_argument("--rate-per-hour", type=int, default=0)
+    parser.add_argument("--rate-per-day", type=int, default=0)
+    parser.add_argument("--burst", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake Namecheap response latency, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fake-rate-limit", type=int, default=0,
+                        help="server-side quota of the fake Namecheap per --fake-rate-period (0 = off)")
+    parser.add_argument("--fake-rate-period", type=float, default=60.0)
+    parser.add_argument("--http-error-rate", type=float, default=0.0)
+    parser.add_argument("--api-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also record the Python heap peak with tracemalloc (slows the run)")
+    parser.add_argument("--verbose", action="store_true", help="print the engine log")
+    args = parser.parse_args(argv)
+
+    report = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {key: value for key, value in vars(args).items() if key not in ("output", "verbose")},
+        "runs": []
+    }
+    for size in args.sizes:
+        run = run_isolated(size, args)
+        report["runs"].append(run)
+        print_run(run)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
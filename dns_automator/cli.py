@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Запуск настройки и проверки DNS без GUI (cron, сервер без дисплея).
+
+    python cli.py setup  --config config.json
+    python cli.py verify --config config.json
+"""
+import argparse
+import signal
+import sys
+from threading import Event
+
+from engine import APPLY_ALWAYS, APPLY_DIFF, CHECK_COLUMNS, VERIFY_API, VERIFY_DNS, DNSEngine, load_config
+from run_metrics import format_summary
+
+
+def print_summary(verification_results):
+    verified = 0
+    for domain, checks in verification_results.items():
+        is_verified = all(checks.values())
+        verified += is_verified
+        marks = " ".join(f"{name}={'OK' if checks.get(name) else 'FAIL'}" for name in CHECK_COLUMNS)
+        print(f"{domain}: {marks}")
+    print(f"\nVerified {verified}/{len(verification_results)} domains")
+    return verified == len(verification_results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DNS Automator (headless)")
+    parser.add_argument("command", choices=["setup", "verify"], help="operation to run")
+    parser.add_argument("--config", default=None, help="path to config.json")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="drive Namecheap API calls from one asyncio event loop (needs aiohttp)")
+    parser.add_argument("--apply-mode", choices=[APPLY_ALWAYS, APPLY_DIFF], default=None,
+                        help="'diff' compares with getHosts and skips setHosts for domains already configured")
+    parser.add_argument("--verify-method", choices=[VERIFY_API, VERIFY_DNS], default=None,
+                        help="'dns' checks CNAME/TXT/MX with direct DNS queries instead of getHosts")
+    parser.add_argument("--export", default=None, metavar="PATH",
+                        help="append each domain's result to PATH as it finishes (.csv or .jsonl)")
+    parser.add_argument("--force", action="store_true",
+                        help="re-apply every domain, ignoring the converged-state cache")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last interrupted run of this command from the journal")
+    args = parser.parse_args(argv)
+
+    stop_event = Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    engine_class = DNSEngine
+    if args.use_async:
+        from async_client import AsyncDNSEngine
+        engine_class = AsyncDNSEngine
+
+    settings = load_config(args.config)
+    if args.apply_mode:
+        settings["apply_mode"] = args.apply_mode
+    if args.verify_method:
+        settings["verify_method"] = args.verify_method
+    if args.export:
+        settings["results_export_path"] = args.export
+    if args.force:
+        settings["skip_converged"] = False
+
+    engine = engine_class(settings, log=lambda message: print(message, flush=True),
+                          stop_event=stop_event)
+    try:
+        if args.command == "setup":
+            results = engine.run_setup(resume=args.resume)
+            print("\n".join(results))
+        else:
+            engine.run_verify(resume=args.resume)
+    except Exception as e:
+        print(f"[ERROR] {str(e)}", file=sys.stderr)
+        return 1
+
+    print("\nTiming: " + " | ".join(format_summary(engine.metrics.summary())))
+    if stop_event.is_set():
+        return 130
+    return 0 if print_summary(engine.verification_results) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
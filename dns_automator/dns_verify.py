@@ -0,0 +1,266 @@
+"""Проверка DNS доменов прямыми запросами к DNS серверу вместо getHosts.
+
+CNAME (трекинг), TXT (SPF и _dmarc) и MX (почта Gmail) запрашиваются по
+UDP для многих доменов параллельно и не расходуют квоту Namecheap.
+Ответы превращаются в записи того же вида, что отдает get_dns_records,
+поэтому проверки и колонки результатов остаются прежними. URL301 в DNS
+не виден: редирект берется из getHosts или проверяется HTTP запросом.
+"""
+import random
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_DNS_SERVER = "dns1.registrar-servers.com"
+DEFAULT_DNS_PORT = 53
+DEFAULT_DNS_TIMEOUT = 3
+DEFAULT_DNS_CONCURRENCY = 50
+DNS_RETRIES = 2
+
+TYPE_CODES = {"A": 1, "NS": 2, "CNAME": 5, "MX": 15, "TXT": 16}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+CLASS_IN = 1
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+FLAG_RESPONSE = 0x8000
+FLAG_TRUNCATED = 0x0200
+FLAG_RECURSION_DESIRED = 0x0100
+
+GMAIL_MX_SUFFIXES = ("google.com", "googlemail.com")
+
+
+class DNSQueryError(Exception):
+    pass
+
+
+def encode_name(name):
+    labels = [label for label in name.rstrip(".").split(".") if label]
+    return b"".join(bytes([len(label)]) + label.encode("idna") for label in labels) + b"\0"
+
+
+def read_name(data, offset):
+    """Читает имя с учетом сжатия (указатели 0xC0); возвращает (имя, смещение после имени)"""
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise DNSQueryError("Name compression loop")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("ascii", "replace"))
+        offset += length
+    return ".".join(labels), (end if end is not None else offset)
+
+
+def build_query(query_id, name, record_type):
+    header = struct.pack(">HHHHHH", query_id, FLAG_RECURSION_DESIRED, 1, 0, 0, 0)
+    return header + encode_name(name) + struct.pack(">HH", TYPE_CODES[record_type], CLASS_IN)
+
+
+def decode_rdata(data, offset, rdlength, record_type):
+    if record_type in ("CNAME", "NS"):
+        return read_name(data, offset)[0]
+    if record_type == "MX":
+        preference = struct.unpack(">H", data[offset:offset + 2])[0]
+        return f"{preference} {read_name(data, offset + 2)[0]}"
+    if record_type == "TXT":
+        # TXT - набор строк <длина><байты>, склеиваем как делает Namecheap
+        parts = []
+        end = offset + rdlength
+        while offset < end:
+            length = data[offset]
+            parts.append(data[offset + 1:offset + 1 + length].decode("utf-8", "replace"))
+            offset += 1 + length
+        return "".join(parts)
+    if record_type == "A":
+        return socket.inet_ntoa(data[offset:offset + 4])
+    return data[offset:offset + rdlength].hex()
+
+
+def parse_response(data, query_id):
+    """Разбирает ответ: (rcode, truncated, [(имя, тип, значение), ...])"""
+    if len(data) < 12:
+        raise DNSQueryError("Short DNS response")
+    response_id, flags, qdcount, ancount, _, _ = struct.unpack(">HHHHHH", data[:12])
+    if response_id != query_id or not flags & FLAG_RESPONSE:
+        raise DNSQueryError("Unexpected DNS response id")
+
+    offset = 12
+    for _ in range(qdcount):
+        offset = read_name(data, offset)[1] + 4
+
+    answers = []
+    for _ in range(ancount):
+        name, offset = read_name(data, offset)
+        type_code, _, _, rdlength = struct.unpack(">HHIH", data[offset:offset + 10])
+        offset += 10
+        record_type = TYPE_NAMES.get(type_code)
+        if record_type:
+            answers.append((name.lower(), record_type, decode_rdata(data, offset, rdlength, record_type)))
+        offset += rdlength
+    return flags & 0x000F, bool(flags & FLAG_TRUNCATED), answers
+
+
+class DNSResolver:
+    """Минимальный stub-резолвер: UDP запрос, при обрезанном ответе - TCP.
+
+    Имя сервера разрешается один раз при создании; если это не удалось,
+    каждый query поднимает DNSQueryError, и домены получают ошибку по
+    отдельности, а не обрывают весь запуск.
+    """
+
+    def __init__(self, server=DEFAULT_DNS_SERVER, port=DEFAULT_DNS_PORT, timeout=DEFAULT_DNS_TIMEOUT,
+                 retries=DNS_RETRIES):
+        self.server = server
+        self.timeout = timeout
+        self.retries = retries
+        self.address = None
+        self.address_error = None
+        try:
+            self.address = (socket.gethostbyname(server), port)
+        except OSError as e:
+            self.address_error = f"Cannot resolve DNS server {server}: {e}"
+
+    def exchange_udp(self, query):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.sendto(query, self.address)
+            return sock.recv(65535)
+
+    def exchange_tcp(self, query):
+        with socket.create_connection(self.address, timeout=self.timeout) as sock:
+            sock.sendall(struct.pack(">H", len(query)) + query)
+            header = self.recv_exact(sock, 2)
+            return self.recv_exact(sock, struct.unpack(">H", header)[0])
+
+    @staticmethod
+    def recv_exact(sock, size):
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise DNSQueryError("DNS connection closed")
+            data += chunk
+        return data
+
+    def query(self, name, record_type):
+        """Значения записей record_type для name; пустой список при NXDOMAIN"""
+        if self.address is None:
+            raise DNSQueryError(self.address_error)
+        last_error = None
+        for _ in range(self.retries + 1):
+            query_id = random.randint(0, 0xFFFF)
+            query = build_query(query_id, name, record_type)
+            try:
+                rcode, truncated, answers = parse_response(self.exchange_udp(query), query_id)
+                if truncated:
+                    rcode, truncated, answers = parse_response(self.exchange_tcp(query), query_id)
+            except (OSError, DNSQueryError) as e:
+                last_error = e
+                continue
+            if rcode == RCODE_NXDOMAIN:
+                return []
+            if rcode != RCODE_NOERROR:
+                raise DNSQueryError(f"{name} {record_type}: DNS server returned rcode {rcode}")
+            owner = name.rstrip(".").lower()
+            return [value for answer_name, answer_type, value in answers
+                    if answer_name == owner and answer_type == record_type]
+        raise DNSQueryError(f"{name} {record_type}: {last_error}")
+
+
+def email_type_from_mx(mx_values):
+    if not mx_values:
+        return "NONE"
+    hosts = [value.split(" ", 1)[-1].rstrip(".").lower() for value in mx_values]
+    if all(host.endswith(GMAIL_MX_SUFFIXES) for host in hosts):
+        return "GMAIL"
+    return "MX"
+
+
+class DNSVerifier:
+    """Собирает записи доменов через резолвер параллельно (dns_concurrency потоков)"""
+
+    def __init__(self, resolver, tracking_host="", concurrency=DEFAULT_DNS_CONCURRENCY, stop_event=None,
+                 log=print):
+        self.resolver = resolver
+        self.tracking_host = tracking_host
+        self.concurrency = concurrency
+        self.stop_event = stop_event
+        self.log = log
+        self.http = None
+
+    @classmethod
+    def from_settings(cls, settings, stop_event=None, log=print):
+        resolver = DNSResolver(server=settings.get("dns_server") or DEFAULT_DNS_SERVER,
+                               port=int(settings.get("dns_port") or DEFAULT_DNS_PORT),
+                               timeout=float(settings.get("dns_timeout") or DEFAULT_DNS_TIMEOUT))
+        return cls(resolver, tracking_host=settings.get("tracking_host", ""),
+                   concurrency=max(1, int(settings.get("dns_concurrency") or DEFAULT_DNS_CONCURRENCY)),
+                   stop_event=stop_event, log=log)
+
+    def http_redirect_records(self, domain_info):
+        """URL301 по HTTP ответу самого домена (без квоты Namecheap)"""
+        import requests
+
+        if self.http is None:
+            self.http = requests.Session()
+        try:
+            r = self.http.head(f"http://{domain_info['domain']}/", allow_redirects=False,
+                               timeout=self.resolver.timeout)
+        except requests.RequestException:
+            # Недоступный сайт - провал только колонки Redirect, а не всей проверки
+            return []
+        location = r.headers.get("Location", "")
+        if r.status_code in (301, 302, 307, 308) and location:
+            return [{"Type": "URL301", "Name": "@", "Address": location, "TTL": None}]
+        return []
+
+    def resolve_records(self, domain_info, redirect_lookup):
+        """Результат в формате get_dns_records, собранный из ответов DNS"""
+        domain = domain_info['domain']
+        started = time.perf_counter()
+        try:
+            records = list(redirect_lookup(domain_info))
+            if self.tracking_host:
+                for value in self.resolver.query(f"{self.tracking_host}.{domain}", "CNAME"):
+                    records.append({"Type": "CNAME", "Name": self.tracking_host, "Address": value, "TTL": None})
+            for value in self.resolver.query(domain, "TXT"):
+                records.append({"Type": "TXT", "Name": "@", "Address": value, "TTL": None})
+            for value in self.resolver.query(f"_dmarc.{domain}", "TXT"):
+                records.append({"Type": "TXT", "Name": "_dmarc", "Address": value, "TTL": None})
+            email_type = email_type_from_mx(self.resolver.query(domain, "MX"))
+        except Exception as e:
+            return {"status": "error", "message": f"{domain} → DNS query failed", "details": str(e),
+                    "latency": time.perf_counter() - started}
+
+        return {
+            "status": "success",
+            "message": f"{domain} → DNS records resolved successfully",
+            "records": records,
+            "email_type": email_type,
+            "latency": time.perf_counter() - started
+        }
+
+    def iter_records(self, domains, redirect_lookup):
+        """Отдает (domain_info, результат) в исходном порядке"""
+        self.log(f"\n[VERIFICATION] Resolving DNS records for {len(domains)} domains "
+                 f"({self.concurrency} parallel queries)...")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self.resolve_records, info, redirect_lookup) for info in domains]
+            for domain_info, future in zip(domains, futures):
+                if self.stop_event is not None and self.stop_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                if future.cancelled():
+                    continue
+                yield domain_info, future.result()
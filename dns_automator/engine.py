@@ -0,0 +1,1069 @@
+import sys
+import json
+import os
+import time
+import re
+import socket
+import heapq
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, RLock
+
+from dns_verify import (DEFAULT_DNS_CONCURRENCY, DEFAULT_DNS_PORT, DEFAULT_DNS_SERVER,
+                        DEFAULT_DNS_TIMEOUT, DNSVerifier)
+from journal import RunJournal
+from namecheap import (BASE_URL, DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_SIZE,
+                       DEFAULT_READ_TIMEOUT, NamecheapClient, NamecheapResponse)
+from results_export import ResultsExporter
+from run_metrics import RunMetrics
+from ratelimit import (DEFAULT_BURST, NAMECHEAP_PER_DAY, NAMECHEAP_PER_HOUR,
+                       NAMECHEAP_PER_MINUTE, RateLimiter)
+from sheets import DEFAULT_FLUSH_EVERY, Inventory, ResultsWriter, SheetsClient, SnapshotCache
+from state_cache import STATE_CACHE_FILE, StateCache, desired_state_hash
+
+CONFIG_FILE = "config.json"
+PROPAGATION_INITIAL_INTERVAL = 5
+PROPAGATION_MAX_INTERVAL = 60
+PROPAGATION_TIMEOUT = 600
+PROPAGATION_BACKOFF = 2
+CHECK_COLUMNS = ("Redirect", "Tracking", "SPF", "DMARC", "Mail Settings")
+SET_HOSTS_EMAIL_TYPE = "Gmail"
+APPLY_ALWAYS = "always"
+APPLY_DIFF = "diff"
+VERIFY_API = "api"
+VERIFY_DNS = "dns"
+REDIRECT_CHECK_API = "api"
+REDIRECT_CHECK_HTTP = "http"
+# Время последнего вызова API в текущем потоке / asyncio задаче
+API_LATENCY = ContextVar("api_latency", default=None)
+
+DEFAULT_CONFIG = {
+    "sheet_url": "",
+    "api_user": "",
+    "api_key": "",
+    "username": "",
+    "client_ip": "",
+    "customer_domain": "",
+    "tracking_host": "inst",
+    "tracking_value": "prox.itrackly.com",
+    "spf": "v=spf1 include:_spf.google.com ~all",
+    "mail_enabled": False,
+    "keyfile_path": "",
+    "api_base_url": BASE_URL,
+    "api_rate_per_minute": NAMECHEAP_PER_MINUTE,
+    "api_rate_per_hour": NAMECHEAP_PER_HOUR,
+    "api_rate_per_day": NAMECHEAP_PER_DAY,
+    "api_burst": DEFAULT_BURST,
+    "http_pool_size": DEFAULT_POOL_SIZE,
+    "connect_timeout": DEFAULT_CONNECT_TIMEOUT,
+    "read_timeout": DEFAULT_READ_TIMEOUT,
+    "concurrency": 4,
+    "sheet_flush_every": DEFAULT_FLUSH_EVERY,
+    "sheet_index_check": True,
+    "apply_mode": APPLY_ALWAYS,
+    "skip_converged": True,
+    "state_cache_path": "",
+    "journal_dir": "",
+    "verify_method": VERIFY_API,
+    "dns_server": DEFAULT_DNS_SERVER,
+    "dns_port": DEFAULT_DNS_PORT,
+    "dns_timeout": DEFAULT_DNS_TIMEOUT,
+    "dns_concurrency": DEFAULT_DNS_CONCURRENCY,
+    "redirect_check": REDIRECT_CHECK_API,
+    "propagation_initial_interval": PROPAGATION_INITIAL_INTERVAL,
+    "propagation_max_interval": PROPAGATION_MAX_INTERVAL,
+    "propagation_timeout": PROPAGATION_TIMEOUT,
+    "results_export_path": "",
+    "sheet_snapshot": True,
+    "snapshot_dir": "",
+    "metrics_dir": ""
+}
+
+# Вычисляются при загрузке конфига и обратно в config.json не сохраняются
+RUNTIME_SETTINGS = ("config_dir",)
+
+REQUIRED_FIELDS = {
+    "Google Sheet URL": "sheet_url",
+    "API User": "api_user",
+    "API Key": "api_key",
+    "Username": "username",
+    "Client IP": "client_ip",
+    "Customer Domain": "customer_domain",
+    "Service Account JSON": "keyfile_path"
+}
+
+
+def get_config_path():
+    """Возвращает путь к конфигу вне EXE"""
+    if getattr(sys, 'frozen', False):
+        # Если запущен как EXE, сохраняем рядом с EXE
+        exe_dir = os.path.dirname(sys.executable)
+        return os.path.join(exe_dir, CONFIG_FILE)
+    else:
+        # Если запущен как скрипт, используем локальный файл
+        return CONFIG_FILE
+
+
+def load_config(config_path=None):
+    """Загружает конфигурацию с обработкой ошибок.
+
+    В config_dir запоминается папка самого конфига: журнал, кэш состояния,
+    снимки и метрики по умолчанию лежат рядом с ним, а не в текущей папке.
+    """
+    config_path = config_path or get_config_path()
+    config_dir = os.path.dirname(os.path.abspath(config_path))
+    try:
+        if os.path.exists(config_path):
+            with open(config_path, "r") as f:
+                return {**DEFAULT_CONFIG, **json.load(f), "config_dir": config_dir}
+        return {**DEFAULT_CONFIG, "config_dir": config_dir}
+    except Exception as e:
+        print(f"Warning: Could not load config: {e}")
+        return {**DEFAULT_CONFIG, "config_dir": config_dir}
+
+
+def get_data_dir(settings):
+    """Папка для служебных файлов по умолчанию - папка конфига"""
+    return settings.get("config_dir") or os.path.dirname(os.path.abspath(get_config_path()))
+
+
+def get_journal_dir(settings):
+    return settings.get("journal_dir") or get_data_dir(settings)
+
+
+def get_snapshot_dir(settings):
+    return settings.get("snapshot_dir") or get_data_dir(settings)
+
+
+def get_metrics_dir(settings):
+    return settings.get("metrics_dir") or get_data_dir(settings)
+
+
+def find_interrupted_operation(settings):
+    """Операция (setup/verify) последнего прерванного запуска или None"""
+    interrupted = []
+    for operation in ("setup", "verify"):
+        journal = RunJournal(get_journal_dir(settings), operation)
+        if journal.has_unfinished_run():
+            interrupted.append((os.path.getmtime(journal.path), operation))
+    return max(interrupted)[1] if interrupted else None
+
+
+def get_current_ip(client=None):
+    """Получает текущий внешний IP адрес"""
+    if client is None:
+        import requests
+        get = requests.get
+    else:
+        get = client.get
+    try:
+        response = get('https://api.ipify.org', timeout=10)
+        return response.text.strip()
+    except:
+        try:
+            response = get('https://ident.me', timeout=10)
+            return response.text.strip()
+        except:
+            return None
+
+
+def validate_ip(ip):
+    """Проверяет валидность IPv4 адреса"""
+    try:
+        socket.inet_aton(ip)
+        return True
+    except socket.error:
+        return False
+
+
+def validate_domain(domain):
+    if not domain:
+        return False
+    pattern = r'^([a-z0-9]+(-[a-z0-9]+)*\.)+[a-z]{2,}$'
+    return re.match(pattern, domain, re.IGNORECASE) is not None
+
+
+def clean_domain_input(domain):
+    domain = (domain or "").strip()
+    if not domain:
+        return ""
+    if domain.startswith(('http://', 'https://')):
+        domain = domain.split('://')[1]
+    domain = domain.split('/')[0].split('?')[0].split('#')[0]
+    domain = domain.split(':')[0]
+    return domain.lower()
+
+
+def build_redirect_url(customer_domain, domain):
+    return f"{customer_domain}?utm_medium=domain_redirect&utm_source=email_outreach&utm_campaign={domain}"
+
+
+def build_hosts(settings, redirect_url, dmarc_records):
+    """Собирает список записей, которые update_dns отправляет в setHosts"""
+    hosts = []
+
+    hosts.append({"Type": "URL301", "Name": "@", "Address": redirect_url})
+
+    tracking_host = settings["tracking_host"]
+    tracking_value = settings["tracking_value"].rstrip('.')
+    if tracking_host and tracking_value:
+        hosts.append({"Type": "CNAME", "Name": tracking_host, "Address": tracking_value})
+
+    spf = settings["spf"]
+    if spf:
+        hosts.append({"Type": "TXT", "Name": "@", "Address": spf})
+
+    for dmarc in dmarc_records:
+        if dmarc:
+            hosts.append({"Type": "TXT", "Name": "_dmarc", "Address": dmarc})
+
+    return hosts
+
+
+def normalize_host(record):
+    """Приводит запись к виду для сравнения желаемого и текущего состояния"""
+    record_type = (record.get("Type") or "").upper()
+    name = (record.get("Name") or "").strip().lower() or "@"
+    address = (record.get("Address") or "").strip().replace('"', '')
+    if record_type in ("CNAME", "MX", "NS"):
+        address = address.rstrip('.').lower()
+    return record_type, name, address
+
+
+def diff_hosts(desired_hosts, current_records, current_email_type, desired_email_type=SET_HOSTS_EMAIL_TYPE):
+    """Сравнивает желаемый набор записей с ответом getHosts.
+
+    Возвращает словарь с расхождениями; пустой словарь - домен уже настроен.
+    MX записи не сравниваются: при EmailType=Gmail их ведет сам Namecheap.
+    """
+    desired = {normalize_host(h) for h in desired_hosts}
+    current = {normalize_host(r) for r in current_records if (r.get("Type") or "").upper() != "MX"}
+    diff = {}
+    if desired - current:
+        diff["missing"] = sorted(desired - current)
+    if current - desired:
+        diff["extra"] = sorted(current - desired)
+    if (current_email_type or "").upper() != desired_email_type.upper():
+        diff["email_type"] = (current_email_type, desired_email_type.upper())
+    return diff
+
+
+def set_hosts_params(domain, hosts):
+    sld, tld = domain.split(".", 1)
+    params = {"SLD": sld, "TLD": tld, "EmailType": SET_HOSTS_EMAIL_TYPE}
+
+    for i, h in enumerate(hosts, 1):
+        params[f"HostName{i}"] = h["Name"]
+        params[f"RecordType{i}"] = h["Type"]
+        params[f"Address{i}"] = h["Address"]
+    return params
+
+
+def get_hosts_params(domain):
+    sld, tld = domain.split(".", 1)
+    return {"SLD": sld, "TLD": tld}
+
+
+def get_hosts_result(domain, response):
+    """Словарь результата get_dns_records из разобранного ответа getHosts"""
+    if response.ok:
+        return {
+            "status": "success",
+            "message": f"{domain} → DNS records retrieved successfully",
+            "records": response.hosts,
+            "email_type": response.email_type
+        }
+    return {"status": "error", "message": f"{domain} → API error", "details": response.error_message()}
+
+
+def set_hosts_result(domain, response):
+    """Словарь результата update_dns из разобранного ответа setHosts"""
+    if response.ok:
+        return {"status": "success", "message": f"{domain} → DNS updated successfully"}
+    return {"status": "error", "message": f"{domain} → API error", "details": response.error_message()}
+
+
+def bucket_records(records):
+    """Раскладывает записи по (тип, имя) за один проход: {(type, name): [address, ...]}"""
+    buckets = {}
+    for record in records:
+        key = ((record.get("Type") or "").upper(), (record.get("Name") or "").lower() or "@")
+        buckets.setdefault(key, []).append(record.get("Address") or "")
+    return buckets
+
+
+class VerificationRules:
+    """Ожидаемые значения проверки, нормализованные один раз на запуск"""
+
+    def __init__(self, settings, dmarc_dict):
+        self.mail_enabled = bool(settings["mail_enabled"])
+        self.tracking_host = settings["tracking_host"].lower()
+        self.tracking_value = settings["tracking_value"].rstrip('.').lower()
+        self.spf = settings["spf"]
+        # {домен: (число записей, множество нормализованных значений)}
+        self.dmarc = {domain: (len(records), frozenset(r.strip().replace('"', '').lower() for r in records))
+                      for domain, records in dmarc_dict.items()}
+
+    def dmarc_for(self, domain):
+        return self.dmarc.get(domain.lower(), (0, frozenset()))
+
+
+class DNSEngine:
+    """Логика настройки и проверки DNS без привязки к Tk.
+
+    Настройки передаются словарем с ключами config.json, вывод идет
+    через колбэки log и on_error, поэтому движок одинаково работает
+    из GUI, из CLI и без дисплея.
+    """
+
+    def __init__(self, settings, log=None, on_error=None, stop_event=None, rate_limiter=None,
+                 client=None, state_cache=None, sheets_client=None):
+        self.settings = {**DEFAULT_CONFIG, **settings}
+        self.log = log or print
+        # Сообщения приходят из нескольких рабочих потоков
+        self.log_lock = RLock()
+        self.on_error = on_error
+        self.stop_event = stop_event or Event()
+        # Лимитер можно передать снаружи, чтобы квота учитывалась между запусками
+        self.rate_limiter = rate_limiter or RateLimiter.from_settings(self.settings,
+                                                                      state_dir=get_data_dir(self.settings))
+        # То же для HTTP клиента: пул соединений переживает отдельные запуски
+        if client is not None:
+            client.update_from_settings(self.settings)
+        self.client = client or NamecheapClient.from_settings(self.settings)
+        self.state_cache = state_cache
+        self.owns_state_cache = False
+        # Авторизованный клиент Google Sheets тоже можно передать на всю сессию
+        self.sheets_client = sheets_client or SheetsClient()
+        self.journal = None
+        self.exporter = None
+        self.spreadsheet = None
+        self.inventory = None
+        self.domains_index = None
+        self.processed_domains = []
+        self.dmarc_dict = {}
+        self.rules = None
+        self.dns_verifier = None
+        self.redirect_records = {}
+        self.verification_results = {}
+        self.metrics = RunMetrics(None)
+        self.rate_wait_mark = 0.0
+
+    def log_message(self, message):
+        with self.log_lock:
+            self.log(message)
+
+    def show_error(self, title, message, details=None):
+        with self.log_lock:
+            if self.on_error:
+                self.on_error(title, message, details)
+            else:
+                self.log_message(f"[ERROR] {title}: {message}")
+                if details:
+                    self.log_message(f"Details:\n{details}")
+
+    def setting(self, key):
+        value = self.settings.get(key, "")
+        return value.strip() if isinstance(value, str) else value
+
+    def missing_fields(self):
+        return [field for field, key in REQUIRED_FIELDS.items() if not self.settings.get(key)]
+
+    def sleep(self, seconds):
+        """Пауза, которую прерывает stop_event"""
+        with self.metrics.phase("propagation_wait"):
+            self.stop_event.wait(seconds)
+
+    def start_metrics(self, operation):
+        self.metrics = RunMetrics(operation)
+        self.rate_wait_mark = self.rate_limiter.total_wait
+
+    def finish_metrics(self):
+        """Закрывает замер запуска и сохраняет его в run_metrics_<operation>.json"""
+        self.metrics.add("rate_limit_wait", self.rate_limiter.total_wait - self.rate_wait_mark)
+        self.metrics.finish()
+        try:
+            path = self.metrics.save(get_metrics_dir(self.settings))
+            self.log_message(f"[METRICS] Phase timings saved to {path}")
+        except OSError as e:
+            self.log_message(f"[WARNING] Failed to save run metrics: {str(e)}")
+
+    @contextmanager
+    def run_scope(self, operation):
+        """Метрики, журнал, экспорт и кэш состояния запуска; закрываются и при исключении"""
+        self.start_metrics(operation)
+        completed = False
+        try:
+            yield
+            completed = True
+        finally:
+            self.close_journal(completed)
+            self.close_exporter()
+            self.close_state_cache()
+            self.save_rate_limiter()
+            self.finish_metrics()
+
+    def save_rate_limiter(self):
+        """Остаток квоты переживает процесс: следующий запуск продолжит с него"""
+        try:
+            self.rate_limiter.save()
+        except OSError as e:
+            self.log_message(f"[WARNING] Failed to save rate limiter state: {str(e)}")
+
+    def open_state_cache(self):
+        if self.state_cache is None:
+            path = self.settings.get("state_cache_path") or os.path.join(
+                get_data_dir(self.settings), STATE_CACHE_FILE)
+            self.state_cache = StateCache(path)
+            self.owns_state_cache = True
+        return self.state_cache
+
+    def close_state_cache(self):
+        """Закрывает только кэш, открытый самим движком"""
+        if self.owns_state_cache:
+            self.state_cache.close()
+            self.state_cache = None
+            self.owns_state_cache = False
+
+    def open_journal(self, operation, resume=False, **info):
+        self.journal = RunJournal(get_journal_dir(self.settings), operation)
+        if self.journal.start(resume, **info):
+            self.log_message(f"\n[RESUME] Continuing interrupted {operation} run: "
+                             f"{len(self.journal.completed)} steps already done")
+        elif resume:
+            self.log_message(f"\n[RESUME] No interrupted {operation} run found, starting from the beginning")
+
+    def close_journal(self, completed=True):
+        """Закрывает журнал; finish пишется, только если запуск не прерван и не упал"""
+        if self.journal is None:
+            return
+        if self.stop_event.is_set() or not completed:
+            self.journal.close()
+        else:
+            self.journal.finish()
+        self.journal = None
+
+    def open_exporter(self):
+        path = self.setting("results_export_path")
+        if path and self.exporter is None:
+            self.exporter = ResultsExporter(path, CHECK_COLUMNS)
+            self.log_message(f"[EXPORT] Streaming results to {path}")
+
+    def close_exporter(self):
+        if self.exporter is not None:
+            self.exporter.close()
+            self.exporter = None
+
+    def export_result(self, operation, domain, result, checks=None, diff=None):
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(operation, domain, result, checks, diff)
+        except Exception as e:
+            self.log_message(f"[WARNING] Failed to export result for {domain}: {str(e)}")
+
+    def journal_done(self, phase, domain):
+        return self.journal.done(phase, domain) if self.journal else None
+
+    def journal_record(self, phase, domain, **data):
+        if self.journal:
+            self.journal.record(phase, domain, **data)
+
+    def journal_written(self, written):
+        """Шаг verify попадает в журнал только после того, как результат записан в таблицу"""
+        for domain, verification_results in written.items():
+            self.journal_record("verify", domain, results=verification_results)
+
+    def desired_state_hash(self, redirect_url, dmarc_records):
+        hosts = build_hosts(self.settings, redirect_url, dmarc_records)
+        return desired_state_hash([normalize_host(h) for h in hosts], SET_HOSTS_EMAIL_TYPE,
+                                  self.settings["mail_enabled"])
+
+    def record_state(self, domain_info, verification_results):
+        """Запоминает хэш домена, прошедшего все достижимые проверки, иначе забывает его"""
+        if self.state_cache is None or not domain_info.get('state_hash'):
+            return
+        attainable = self.attainable_checks()
+        try:
+            if all(ok for name, ok in verification_results.items() if name in attainable):
+                self.state_cache.mark_verified(domain_info['domain'], domain_info['state_hash'])
+            else:
+                self.state_cache.forget(domain_info['domain'])
+        except Exception as e:
+            self.log_message(f"[WARNING] Failed to update state cache for {domain_info['domain']}: {str(e)}")
+
+    def open_spreadsheet(self):
+        with self.metrics.phase("sheet_auth"):
+            self.sheets_client.update_keyfile(self.settings["keyfile_path"])
+            _, authorized = self.sheets_client.authorize()
+            if authorized:
+                self.log_message("\n[Google Sheets] Initializing connection...")
+            else:
+                self.log_message("\n[Google Sheets] Reusing authorized connection")
+
+            self.log_message(f"[Google Sheets] Opening spreadsheet: {self.settings['sheet_url']}")
+            self.spreadsheet = self.sheets_client.open_by_url(self.settings["sheet_url"])
+
+    def load_dmarc(self, gsuites):
+        self.dmarc_dict = {}
+
+        for domain, dmarc in zip(gsuites.column("Domain"), gsuites.column("DMARC")):
+            if self.stop_event.is_set():
+                break
+            domain = clean_domain_input(domain)
+            if domain and dmarc:
+                domain_lower = domain.lower()
+                if domain_lower not in self.dmarc_dict:
+                    self.dmarc_dict[domain_lower] = []
+                if dmarc.strip():
+                    self.dmarc_dict[domain_lower].append(dmarc.strip())
+
+    def load_inventory(self, dmarc_required=True):
+        """Открывает таблицу и загружает оба листа одним запросом; возвращает ячейки Domain.
+
+        Без dmarc_required недоступный лист G-Suites - только предупреждение.
+        """
+        self.open_spreadsheet()
+        self.log_message("[Google Sheets] Loading Domains and G-Suites sheets...")
+        snapshot = SnapshotCache(get_snapshot_dir(self.settings)) if self.settings.get("sheet_snapshot") else None
+        with self.metrics.phase("sheet_read"):
+            self.inventory = Inventory.load(self.spreadsheet, snapshot)
+        if self.inventory.from_snapshot:
+            self.log_message("[Google Sheets] Spreadsheet unchanged since last run, using local snapshot")
+        self.domains_index = self.inventory.index
+
+        self.dmarc_dict = {}
+        if self.inventory.gsuites_error is None:
+            self.load_dmarc(self.inventory.gsuites)
+        elif dmarc_required:
+            raise ValueError(f"Failed to read G-Suites sheet: {self.inventory.gsuites_error}")
+        else:
+            self.log_message(f"[WARNING] Failed to read G-Suites sheet: {self.inventory.gsuites_error}")
+
+        if self.inventory.domains_error is not None:
+            raise ValueError(f"Failed to read Domains sheet: {self.inventory.domains_error}")
+        domain_cells = self.inventory.domain_cells()
+        if not domain_cells:
+            raise ValueError("Failed to read Domains sheet: No domains found in Domains sheet")
+        return domain_cells
+
+    def on_rate_limit_wait(self, wait):
+        self.log_message(f"[PAUSE] Rate limit reached, waiting {wait:.1f} seconds before next API call...")
+
+    def check_client_ip(self):
+        """Проверка IP адреса перед выполнением запроса; возвращает IP или None"""
+        client_ip = self.setting("client_ip")
+        if not validate_ip(client_ip):
+            self.show_error("IP Error", "Invalid IP address format", "Please enter a valid IPv4 address")
+            return None
+        return client_ip
+
+    def handle_api_response(self, text, client_ip):
+        """Разбирает ответ и проверяет его; None - ответ отброшен"""
+        response = NamecheapResponse.parse(text)
+
+        # Проверка на ошибку IP адреса в ответе API
+        if response.ip_mismatch:
+            self.report_ip_mismatch(client_ip, get_current_ip(self.client))
+            return None
+        return self.check_api_response(response, client_ip)
+
+    def report_ip_mismatch(self, client_ip, current_real_ip):
+        error_msg = f"IP address mismatch! Configured IP: {client_ip}"
+        if current_real_ip:
+            error_msg += f", Current real IP: {current_real_ip}"
+        self.show_error("IP Mismatch Error", error_msg)
+
+    def check_api_response(self, response, client_ip):
+        """Общие для sync и async клиентов проверки разобранного ответа; None - ответ отброшен"""
+        # Проверка на ошибку 1011150 (IP не в whitelist)
+        if response.whitelist_error:
+            # При параллельных вызовах ошибку показываем один раз
+            if not self.stop_event.is_set():
+                self.stop_event.set()
+                self.show_error("IP Whitelist Error",
+                                "Your IP address is not whitelisted in Namecheap",
+                                f"Please add your IP address ({client_ip}) to the Namecheap API whitelist\nDetails: Code 1011150: Invalid request IP")
+            return None
+
+        self.log_message(f"[API Response] Received {response.size} characters")
+        return response
+
+    def namecheap_api(self, command, params):
+        import requests
+
+        API_LATENCY.set(None)
+        if self.stop_event.is_set():
+            return None
+
+        client_ip = self.check_client_ip()
+        if client_ip is None:
+            return None
+
+        if not self.rate_limiter.acquire(self.stop_event, self.on_rate_limit_wait):
+            return None
+
+        try:
+            self.log_message(f"\n[API Request] Sending {command} to {self.client.base_url}")
+            started = time.perf_counter()
+            text = self.client.call(command, params)
+            API_LATENCY.set(time.perf_counter() - started)
+            self.metrics.record_latency(API_LATENCY.get())
+            return self.handle_api_response(text, client_ip)
+
+        except requests.RequestException as e:
+            error_details = f"URL: {self.client.base_url}\nCommand: {command}\nParams: {params}"
+            self.show_error("API Communication Error", f"Failed to communicate with Namecheap API:\n{str(e)}", error_details)
+            return None
+        except Exception as e:
+            self.show_error("API Error", f"Unexpected API error:\n{str(e)}")
+            return None
+
+    def get_dns_records(self, domain):
+        try:
+            if not domain:
+                return {"status": "error", "message": "Empty domain"}
+
+            if not validate_domain(domain):
+                return {"status": "error", "message": f"Invalid domain format: {domain}"}
+
+            response = self.namecheap_api("namecheap.domains.dns.getHosts", get_hosts_params(domain))
+
+            if response is None:
+                return {"status": "error", "message": "API request failed", "latency": API_LATENCY.get()}
+
+            return {**get_hosts_result(domain, response), "latency": API_LATENCY.get()}
+
+        except Exception as e:
+            return {"status": "error", "message": f"{domain} → Error", "details": str(e)}
+
+    def iter_dns_records(self, domains):
+        """Отдает (domain_info, результат get_dns_records) в исходном порядке"""
+        for domain_info in domains:
+            if self.stop_event.is_set():
+                break
+            self.log_message(f"\n[VERIFICATION] Checking DNS records for {domain_info['domain']}...")
+            yield domain_info, self.get_dns_records(domain_info['domain'])
+
+    def get_redirect_records(self, domain_info):
+        """URL301 записи домена из getHosts (в DNS редирект Namecheap не виден).
+
+        URL301 отдает сам Namecheap и от распространения DNS не зависит,
+        поэтому getHosts делается один раз на домен за запуск проверки, а
+        повторные раунды опроса идут только DNS запросами.
+        """
+        domain = domain_info['domain']
+        if domain not in self.redirect_records:
+            result = self.get_dns_records(domain)
+            if result["status"] != "success":
+                raise RuntimeError(result.get("details") or result["message"])
+            self.redirect_records[domain] = [record for record in result["records"] if record["Type"] == "URL301"]
+        return self.redirect_records[domain]
+
+    def iter_resolver_records(self, domains):
+        """Как iter_dns_records, но CNAME/TXT/MX берутся прямыми DNS запросами"""
+        verifier = self.open_dns_verifier()
+        if (self.settings.get("redirect_check") or REDIRECT_CHECK_API).lower() == REDIRECT_CHECK_HTTP:
+            redirect_lookup = verifier.http_redirect_records
+        else:
+            redirect_lookup = self.get_redirect_records
+        yield from verifier.iter_records(domains, redirect_lookup)
+
+    def open_dns_verifier(self):
+        """Один DNSVerifier (и одно разрешение имени DNS сервера) на весь запуск проверки"""
+        if self.dns_verifier is None:
+            self.dns_verifier = DNSVerifier.from_settings(self.settings, stop_event=self.stop_event,
+                                                          log=self.log_message)
+            if self.dns_verifier.resolver.address_error:
+                self.log_message(f"[WARNING] {self.dns_verifier.resolver.address_error}")
+        return self.dns_verifier
+
+    def verify_method(self):
+        return (self.settings.get("verify_method") or VERIFY_API).lower()
+
+    def fetch_records(self, domains):
+        if self.verify_method() == VERIFY_DNS:
+            return self.iter_resolver_records(domains)
+        return self.iter_dns_records(domains)
+
+    def check_domain(self, domain_info, result):
+        """Результаты колонок CHECK_COLUMNS по записям домена"""
+        domain = domain_info['domain']
+        redirect_url = domain_info['redirect_url']
+
+        if result["status"] != "success":
+            self.log_message(f"[VERIFICATION FAILED] {domain}: {result['message']}")
+            return dict.fromkeys(CHECK_COLUMNS, False)
+
+        buckets = bucket_records(result["records"])
+        email_type = result.get("email_type", "UNKNOWN")
+        rules = self.rules or VerificationRules(self.settings, self.dmarc_dict)
+
+        verification_results = dict.fromkeys(CHECK_COLUMNS, False)
+
+        mail_settings_ok = email_type == "GMAIL" and rules.mail_enabled
+        verification_results["Mail Settings"] = mail_settings_ok
+
+        if not mail_settings_ok:
+            self.log_message(f"[MAIL SETTINGS ERROR] Expected GMAIL, got: {email_type}")
+
+        # Проверка URL redirect
+        verification_results["Redirect"] = any(
+            redirect_url in address for address in buckets.get(("URL301", "@"), ()))
+
+        # Проверка CNAME
+        if rules.tracking_host and rules.tracking_value:
+            cnames = buckets.get(("CNAME", rules.tracking_host), ())
+            verification_results["Tracking"] = any(
+                address.rstrip('.').lower() == rules.tracking_value for address in cnames)
+
+        # Проверка SPF
+        if rules.spf:
+            verification_results["SPF"] = any(
+                rules.spf in address.replace('"', '') for address in buckets.get(("TXT", "@"), ()))
+
+        # Проверка DMARC: столько же записей, и каждая ожидаемая найдена
+        actual_dmarc_records = [address.strip().replace('"', '').lower()
+                                for address in buckets.get(("TXT", "_dmarc"), ())]
+        expected_count, expected_dmarc_records = rules.dmarc_for(domain)
+        if len(actual_dmarc_records) == expected_count:
+            verification_results["DMARC"] = expected_dmarc_records <= set(actual_dmarc_records)
+
+        return verification_results
+
+    def finish_verification(self, domain_info, verification_results, writer, result):
+        domain = domain_info['domain']
+        self.verification_results[domain] = verification_results
+        self.record_state(domain_info, verification_results)
+        if self.exporter is not None:
+            diff = None
+            if result["status"] == "success":
+                hosts = build_hosts(self.settings, domain_info['redirect_url'], self.dmarc_dict.get(domain.lower(), []))
+                diff = diff_hosts(hosts, result["records"], result.get("email_type"))
+            self.export_result("verify", domain, result, verification_results, diff)
+        if result["status"] == "success":
+            writer.add(domain, verification_results)
+            self.log_message(f"[VERIFICATION SUCCESS] {domain} → Checked")
+
+    def attainable_checks(self):
+        """Колонки, которые могут пройти при текущих настройках (ждать имеет смысл только их)"""
+        checks = {"Redirect", "DMARC"}
+        if self.settings["mail_enabled"]:
+            checks.add("Mail Settings")
+        if self.settings["tracking_host"] and self.settings["tracking_value"]:
+            checks.add("Tracking")
+        if self.settings["spf"]:
+            checks.add("SPF")
+        return checks
+
+    def poll_until_verified(self, domains, writer):
+        """Перепроверяет домены с экспоненциальной паузой, пока они не пройдут проверку.
+
+        Первая проверка сразу; прошедший домен сразу записывается и больше
+        не опрашивается. Не прошедший ждет interval, затем interval растет
+        в PROPAGATION_BACKOFF раз до propagation_max_interval. После
+        propagation_timeout записывается последний (неуспешный) результат.
+        """
+        interval = float(self.settings.get("propagation_initial_interval") or PROPAGATION_INITIAL_INTERVAL)
+        max_interval = float(self.settings.get("propagation_max_interval") or PROPAGATION_MAX_INTERVAL)
+        timeout = float(self.settings.get("propagation_timeout", PROPAGATION_TIMEOUT) or 0)
+        deadline = time.monotonic() + timeout
+        attainable = self.attainable_checks()
+
+        self.log_message(f"\n[INFO] Polling DNS propagation for {len(domains)} domains (up to {timeout:.0f} seconds)...")
+        # Очередь (время проверки, номер домена, следующая пауза)
+        schedule = [(0, index, interval) for index in range(len(domains))]
+        while schedule and not self.stop_event.is_set():
+            self.sleep(max(0, schedule[0][0] - time.monotonic()))
+            if self.stop_event.is_set():
+                break
+
+            now = time.monotonic()
+            due = []
+            while schedule and schedule[0][0] <= now:
+                due.append(heapq.heappop(schedule))
+
+            # При остановке fetch_records отдает не все домены, поэтому сопоставляем по объекту
+            pending = {id(domains[index]): (index, next_interval) for _, index, next_interval in due}
+            for domain_info, result in self.fetch_records([domains[index] for _, index, _ in due]):
+                index, next_interval = pending[id(domain_info)]
+                verification_results = self.check_domain(domain_info, result)
+                failed = [name for name, ok in verification_results.items() if not ok and name in attainable]
+                now = time.monotonic()
+                if not failed or now >= deadline:
+                    self.finish_verification(domain_info, verification_results, writer, result)
+                    continue
+                failed = ", ".join(failed)
+                self.log_message(f"[PROPAGATION] {domain_info['domain']}: {failed} not ready, "
+                                 f"retrying in {next_interval:g} seconds")
+                heapq.heappush(schedule, (min(now + next_interval, deadline), index,
+                                          min(next_interval * PROPAGATION_BACKOFF, max_interval)))
+
+    def verify_dns_settings_for_all_domains(self, poll=False):
+        """Проверка всех processed_domains; poll=True - ждать распространения DNS.
+
+        Ждать имеет смысл только при verify_method=dns: getHosts отдает
+        состояние Namecheap, которое верно сразу после setHosts, поэтому
+        повторные вызовы только тратили бы квоту API.
+        """
+        if not self.processed_domains:
+            self.log_message("No domains to verify!")
+            return
+
+        self.log_message(f"\n=== Starting DNS Verification for {len(self.processed_domains)} domains ===")
+        self.rules = VerificationRules(self.settings, self.dmarc_dict)
+        self.dns_verifier = None
+        self.redirect_records = {}
+        writer = ResultsWriter(self.inventory.domains_worksheet(), self.domains_index,
+                               flush_every=int(self.settings.get("sheet_flush_every") or 0),
+                               check_index=bool(self.settings.get("sheet_index_check")),
+                               log=self.log_message, inventory=self.inventory, metrics=self.metrics,
+                               on_written=self.journal_written)
+
+        # Домены, проверенные до прерывания запуска, берем из журнала
+        to_check = []
+        for domain_info in self.processed_domains:
+            done = self.journal_done("verify", domain_info['domain'])
+            if done:
+                self.verification_results[domain_info['domain']] = done["results"]
+            else:
+                to_check.append(domain_info)
+        if len(to_check) < len(self.processed_domains):
+            self.log_message(f"[RESUME] {len(self.processed_domains) - len(to_check)} domains already verified, skipped")
+
+        if poll and self.verify_method() == VERIFY_DNS:
+            self.poll_until_verified(to_check, writer)
+            # Домены завершаются в порядке прохождения проверки - возвращаем порядок таблицы
+            order = {info['domain']: i for i, info in enumerate(self.processed_domains)}
+            ordered = sorted(self.verification_results.items(), key=lambda item: order.get(item[0], len(order)))
+            self.verification_results.clear()
+            self.verification_results.update(ordered)
+        else:
+            for domain_info, result in self.fetch_records(to_check):
+                self.finish_verification(domain_info, self.check_domain(domain_info, result), writer, result)
+
+        # Остаток пачки пишем и при остановке, чтобы частичный прогресс попал в таблицу
+        writer.flush()
+
+        if self.stop_event.is_set():
+            self.log_message("\n[STOPPED] Verification process stopped by user")
+
+        self.log_message("\n=== DNS Verification Complete ===")
+
+    def apply_mode(self):
+        return (self.settings.get("apply_mode") or APPLY_ALWAYS).lower()
+
+    def current_diff(self, hosts, current):
+        """Расхождения с ответом getHosts; None - текущие записи прочитать не удалось"""
+        if current["status"] != "success":
+            return None
+        return diff_hosts(hosts, current["records"], current.get("email_type"))
+
+    def check_unchanged(self, domain, diff, current):
+        """В режиме diff: результат "без изменений" или None, если нужен setHosts"""
+        if diff is None or diff:
+            # Не смогли прочитать текущие записи или есть расхождения - применяем
+            return None
+        self.log_message(f"[DNS Update] {domain} already up to date, setHosts skipped")
+        return {"status": "success", "message": f"{domain} → DNS already up to date", "unchanged": True,
+                "diff": diff, "latency": current.get("latency")}
+
+    def update_dns(self, domain, redirect_url, dmarc_records):
+        try:
+            if not domain or not validate_domain(domain):
+                return {"status": "error", "message": "Invalid domain"}
+
+            hosts = build_hosts(self.settings, redirect_url, dmarc_records)
+
+            diff = None
+            read_latency = 0
+            if self.apply_mode() == APPLY_DIFF:
+                current = self.get_dns_records(domain)
+                diff = self.current_diff(hosts, current)
+                unchanged = self.check_unchanged(domain, diff, current)
+                if unchanged:
+                    return unchanged
+                read_latency = current.get("latency") or 0
+
+            self.log_message(f"\n[DNS Update] Processing {domain} with {len(hosts)} records...")
+            response = self.namecheap_api("namecheap.domains.dns.setHosts", set_hosts_params(domain, hosts))
+            latency = read_latency + (API_LATENCY.get() or 0)
+
+            if response is None:
+                return {"status": "error", "message": "API request failed", "diff": diff, "latency": latency}
+
+            return {**set_hosts_result(domain, response), "diff": diff, "latency": latency}
+
+        except Exception as e:
+            return {"status": "error", "message": f"{domain} → Error", "details": str(e)}
+
+    def setup_domain(self, job, total):
+        """Настраивает один домен; вызывается из пула потоков run_setup"""
+        i, domain, current_redirect, dmarc_records, _ = job
+        try:
+            if self.stop_event.is_set():
+                return False, f"Row {i} → STOPPED: {domain}"
+
+            self.log_message(f"\nProcessing {i}/{total}: {domain}")
+            self.log_message(f"Redirect URL: {current_redirect}")
+
+            if self.settings["mail_enabled"]:
+                self.log_message("Mail settings enabled")
+
+            result = self.update_dns(domain, current_redirect, dmarc_records)
+            self.export_result("setup", domain, result)
+
+            if result["status"] == "success":
+                return True, result["message"]
+
+            error_msg = f"{result['message']}"
+            if "details" in result:
+                error_msg += f"\nDetails: {result['details']}"
+            self.log_message(f"[ERROR] {error_msg}")
+            return False, error_msg
+
+        except Exception as e:
+            error_msg = f"Row {i} → ERROR: {str(e)}"
+            self.log_message(error_msg)
+            return False, error_msg
+
+    def apply_jobs(self, jobs, total, concurrency):
+        """Отдает (job, (success, message)) в порядке jobs, выполняя их в пуле потоков"""
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(self.setup_domain, job, total) for job in jobs]
+            stopped = False
+            for job, future in zip(jobs, futures):
+                if self.stop_event.is_set() and not stopped:
+                    self.log_message("\n[STOPPED] Process stopped by user")
+                    for pending in futures:
+                        pending.cancel()
+                    stopped = True
+                # Уже выполненные задачи отдаем и после остановки, чтобы они попали в журнал
+                if future.cancelled():
+                    continue
+                yield job, future.result()
+
+    def run_setup(self, resume=False):
+        """Полный цикл: настройка DNS по таблице, ожидание и проверка.
+
+        С resume=True продолжает прерванный запуск по журналу: уже
+        примененные и проверенные домены повторно не трогаются.
+        Возвращает список строк с результатом по каждой строке таблицы.
+        """
+        self.processed_domains = []
+        self.verification_results.clear()
+        with self.run_scope("setup"):
+            missing_fields = self.missing_fields()
+            if missing_fields:
+                raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
+
+            customer_domain = self.setting("customer_domain")
+
+            domain_cells = self.load_inventory(dmarc_required=True)
+
+            self.open_state_cache()
+            skip_converged = bool(self.settings.get("skip_converged"))
+            converged = self.state_cache.load() if skip_converged else {}
+
+            results = [None] * len(domain_cells)
+            jobs = []
+            skipped = 0
+            for i, cell in enumerate(domain_cells, 1):
+                domain = clean_domain_input(cell)
+                if not domain:
+                    results[i - 1] = f"Row {i} → ERROR: Empty domain value"
+                    continue
+
+                if not validate_domain(domain):
+                    results[i - 1] = f"Row {i} → ERROR: Invalid domain format: {domain}"
+                    continue
+
+                current_redirect = build_redirect_url(customer_domain, domain)
+                dmarc_records = self.dmarc_dict.get(domain.lower(), [])
+                state_hash = self.desired_state_hash(current_redirect, dmarc_records)
+                # Желаемое состояние не менялось с последней успешной проверки - API не трогаем
+                if converged.get(domain) == state_hash:
+                    results[i - 1] = f"{domain} → Unchanged since last verified run, skipped"
+                    skipped += 1
+                    continue
+
+                jobs.append((i, domain, current_redirect, dmarc_records, state_hash))
+
+            if skipped:
+                self.log_message(f"\n[CACHE] {skipped} domains unchanged since last verified run, skipped")
+
+            self.open_journal("setup", resume, total=len(jobs))
+            self.open_exporter()
+            pending_jobs = []
+            for job in jobs:
+                i, domain, current_redirect, _, state_hash = job
+                if self.journal_done("setup", domain):
+                    results[i - 1] = f"{domain} → DNS updated before interruption, skipped"
+                    self.processed_domains.append({'domain': domain, 'redirect_url': current_redirect,
+                                                   'state_hash': state_hash})
+                else:
+                    pending_jobs.append(job)
+            jobs = pending_jobs
+
+            # setHosts для разных доменов независимы, поэтому идут параллельно;
+            # общий темп все равно задает rate_limiter внутри namecheap_api
+            concurrency = max(1, int(self.settings.get("concurrency") or 1))
+            self.log_message(f"\n[INFO] Applying DNS settings to {len(jobs)} domains ({concurrency} workers)")
+
+            with self.metrics.phase("dns_apply"):
+                for (i, domain, current_redirect, _, state_hash), (success, message) in self.apply_jobs(jobs, len(domain_cells), concurrency):
+                    results[i - 1] = message
+                    if success:
+                        self.journal_record("setup", domain)
+                        self.processed_domains.append({'domain': domain, 'redirect_url': current_redirect,
+                                                       'state_hash': state_hash})
+
+            # Задачи, отмененные остановкой, тоже получают строку результата
+            for i, domain, _, _, _ in jobs:
+                if results[i - 1] is None:
+                    results[i - 1] = f"Row {i} → STOPPED: {domain}"
+            results = [message for message in results if message is not None]
+
+            if not self.stop_event.is_set():
+                self.log_message("\n=== DNS Setup Complete ===")
+
+                if self.processed_domains:
+                    with self.metrics.phase("verification"):
+                        self.verify_dns_settings_for_all_domains(poll=True)
+
+                self.log_message("\n=== Operation Complete ===")
+            else:
+                self.log_message("\n=== Operation Stopped ===")
+
+            return results
+
+    def run_verify(self, resume=False):
+        """Проверяет DNS всех доменов из листа Domains"""
+        self.verification_results.clear()
+        with self.run_scope("verify"):
+            domain_cells = self.load_inventory(dmarc_required=False)
+            self.open_state_cache()
+
+            customer_domain = self.setting("customer_domain")
+            domains_to_verify = []
+            for cell in domain_cells:
+                if self.stop_event.is_set():
+                    self.log_message("\n[STOPPED] Verification process stopped by user")
+                    break
+
+                domain = clean_domain_input(cell)
+                if domain and validate_domain(domain):
+                    redirect_url = build_redirect_url(customer_domain, domain)
+                    domains_to_verify.append({
+                        'domain': domain,
+                        'redirect_url': redirect_url,
+                        'state_hash': self.desired_state_hash(redirect_url, self.dmarc_dict.get(domain, []))
+                    })
+
+            self.processed_domains = domains_to_verify
+            self.open_journal("verify", resume, total=len(domains_to_verify))
+            self.open_exporter()
+            with self.metrics.phase("verification"):
+                self.verify_dns_settings_for_all_domains()
+        return self.verification_results
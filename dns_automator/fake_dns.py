@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Локальный DNS сервер-заглушка для проверки dns_verify без сети.
+
+Отвечает по UDP на CNAME/TXT/MX из словаря зоны или прямо из состояния
+fake_namecheap (записи, заданные через setHosts, сразу видны в DNS):
+
+    python fake_dns.py --port 5353
+    # в config.json: "verify_method": "dns", "dns_server": "127.0.0.1", "dns_port": 5353
+"""
+import argparse
+import socketserver
+import struct
+from threading import Thread
+
+from dns_verify import CLASS_IN, FLAG_RESPONSE, RCODE_NXDOMAIN, TYPE_NAMES, encode_name, read_name
+
+GMAIL_MX = ["1 aspmx.l.google.com", "5 alt1.aspmx.l.google.com", "5 alt2.aspmx.l.google.com",
+            "10 alt3.aspmx.l.google.com", "10 alt4.aspmx.l.google.com"]
+ANSWER_TTL = 60
+
+
+def encode_rdata(record_type, value):
+    if record_type in ("CNAME", "NS"):
+        return encode_name(value)
+    if record_type == "MX":
+        preference, host = value.split(" ", 1)
+        return struct.pack(">H", int(preference)) + encode_name(host)
+    if record_type == "TXT":
+        raw = value.encode("utf-8")
+        chunks = [raw[i:i + 255] for i in range(0, len(raw), 255)] or [b""]
+        return b"".join(bytes([len(chunk)]) + chunk for chunk in chunks)
+    raise ValueError(f"Unsupported record type: {record_type}")
+
+
+def build_response(query, lookup):
+    query_id, flags, qdcount = struct.unpack(">HHH", query[:6])
+    name, offset = read_name(query, 12)
+    type_code = struct.unpack(">H", query[offset:offset + 2])[0]
+    question = query[12:offset + 4]
+
+    record_type = TYPE_NAMES.get(type_code)
+    values = lookup(name.lower(), record_type) if record_type else []
+    rcode = 0 if values is not None else RCODE_NXDOMAIN
+    answers = b""
+    for value in values or []:
+        rdata = encode_rdata(record_type, value)
+        answers += encode_name(name) + struct.pack(">HHIH", type_code, CLASS_IN, ANSWER_TTL, len(rdata)) + rdata
+
+    header = struct.pack(">HHHHHH", query_id, FLAG_RESPONSE | (flags & 0x0100) | 0x0080 | rcode, 1,
+                         len(values or []), 0, 0)
+    return header + question + answers
+
+
+def static_zone(zone):
+    """lookup по словарю {(имя, тип): [значения]}; None - имени нет (NXDOMAIN)"""
+    names = {name for name, _ in zone}
+
+    def lookup(name, record_type):
+        if name not in names:
+            return None
+        return zone.get((name, record_type), [])
+    return lookup
+
+
+def namecheap_zone(state):
+    """lookup поверх FakeNamecheapState: хосты доменов и MX Gmail при EmailType=GMAIL"""
+    def lookup(name, record_type):
+        with state.lock:
+            domains = dict(state.domains)
+        for domain, (hosts, email_type) in domains.items():
+            if name == domain:
+                host_name = "@"
+            elif name.endswith("." + domain):
+                host_name = name[:-len(domain) - 1]
+            else:
+                continue
+            values = [h["Address"] for h in hosts
+                      if h["Name"].lower() == host_name and h["Type"] == record_type]
+            if record_type == "MX" and host_name == "@" and email_type == "GMAIL":
+                values += GMAIL_MX
+            return values
+        return None
+    return lookup
+
+
+class FakeDNSHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        try:
+            sock.sendto(build_response(data, self.server.lookup), self.client_address)
+        except Exception:
+            pass
+
+
+class FakeDNSServer:
+    """UDP DNS сервер на локальном порту в фоновом потоке"""
+
+    def __init__(self, lookup, host="127.0.0.1", port=0):
+        self.server = socketserver.ThreadingUDPServer((host, port), FakeDNSHandler)
+        self.server.daemon_threads = True
+        self.server.lookup = lookup
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address[:2]
+
+    def start(self):
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stub DNS server backed by a fake Namecheap API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5353)
+    parser.add_argument("--namecheap-port", type=int, default=8765,
+                        help="also run fake_namecheap on this port and serve its records")
+    args = parser.parse_args(argv)
+
+    from fake_namecheap import FakeNamecheapServer
+
+    with FakeNamecheapServer(port=args.namecheap_port) as namecheap:
+        server = FakeDNSServer(namecheap_zone(namecheap.state), args.host, args.port)
+        print(f"Fake Namecheap API on {namecheap.url}, DNS on {args.host}:{args.port}/udp")
+        try:
+            server.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
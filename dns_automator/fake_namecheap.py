@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Локальная замена api.namecheap.com/xml.response для тестов и замеров.
+
+Хранит записи доменов в памяти и отвечает на getHosts/setHosts в том же
+XML формате, что и настоящий API. Сетевой доступ и whitelisted IP не нужны:
+
+    python fake_namecheap.py --port 8765
+    # в config.json: "api_base_url": "http://127.0.0.1:8765/xml.response"
+
+Для замеров пропускной способности и поведения при сбоях можно задать
+задержку ответа, квоту вызовов и долю отказов:
+
+    python fake_namecheap.py --latency 0.3 --jitter 0.2 --rate-limit 20 --rate-period 60 \
+        --http-error-rate 0.02 --api-error-rate 0.01 --seed 1
+"""
+import argparse
+import random
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qsl, urlparse
+from xml.sax.saxutils import escape, quoteattr
+
+XMLNS = "http://api.namecheap.com/xml.response"
+
+# Коды ошибок, которые отдает настоящий API
+ERROR_WHITELIST = "1011150"
+ERROR_INVALID_COMMAND = "1010900"
+ERROR_RATE_LIMIT = "500000"
+ERROR_INTERNAL = "5050900"
+
+
+def api_response(command, body="", errors=()):
+    status = "ERROR" if errors else "OK"
+    errors_xml = "".join(f'<Error Number="{number}">{escape(text)}</Error>' for number, text in errors)
+    return (f'<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<ApiResponse Status="{status}" xmlns="{XMLNS}">'
+            f'<Errors>{errors_xml}</Errors><Warnings />'
+            f'<RequestedCommand>{escape(command.lower())}</RequestedCommand>'
+            f'<CommandResponse Type="{escape(command)}">{body}</CommandResponse>'
+            f'<Server>FAKE</Server><GMTTimeDifference>+0:00</GMTTimeDifference>'
+            f'<ExecutionTime>0.001</ExecutionTime></ApiResponse>')
+
+
+class FakeNamecheapState:
+    """Состояние DNS всех доменов в памяти, счетчики вызовов и внедряемые сбои.
+
+    latency/jitter - задержка каждого ответа (секунды, jitter - случайная
+    добавка сверху). rate_limit вызовов за скользящее окно rate_period
+    секунд, сверх квоты - ошибка 500000, как у настоящего API.
+    http_error_rate - доля ответов HTTP 503, api_error_rate - доля
+    ответов Status="ERROR". seed делает последовательность сбоев
+    воспроизводимой.
+    """
+
+    def __init__(self, allowed_ips=None, latency=0.0, jitter=0.0, rate_limit=0, rate_period=60.0,
+                 http_error_rate=0.0, api_error_rate=0.0, seed=None):
+        self.allowed_ips = set(allowed_ips or ())
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.http_error_rate = http_error_rate
+        self.api_error_rate = api_error_rate
+        self.random = random.Random(seed)
+        self.recent = deque()
+        self.domains = {}
+        self.calls = {}
+        self.failures = {}
+        self.lock = Lock()
+
+    def count_failure(self, kind):
+        with self.lock:
+            self.failures[kind] = self.failures.get(kind, 0) + 1
+
+    def over_quota(self):
+        """Учитывает вызов в скользящем окне; True - квота исчерпана"""
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and now - self.recent[0] >= self.rate_period:
+                self.recent.popleft()
+            if len(self.recent) >= self.rate_limit:
+                return True
+            self.recent.append(now)
+            return False
+
+    def respond(self, params):
+        """Ответ на запрос с учетом задержки и сбоев: (HTTP статус, XML)"""
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        command = params.get("Command", "")
+        with self.lock:
+            # Считаем каждую попытку, в том числе отклоненные и сбойные
+            self.calls[command] = self.calls.get(command, 0) + 1
+            roll = self.random.random()
+        if roll < self.http_error_rate:
+            self.count_failure("http_error")
+            return 503, "Service Unavailable"
+        if self.over_quota():
+            self.count_failure("rate_limited")
+            return 200, api_response(command, errors=[(ERROR_RATE_LIMIT, "Too many requests")])
+        if roll < self.http_error_rate + self.api_error_rate:
+            self.count_failure("api_error")
+            return 200, api_response(command, errors=[(ERROR_INTERNAL, "Unhandled exception (injected)")])
+        return 200, self.handle(params)
+
+    def stats(self):
+        with self.lock:
+            return {"calls": dict(self.calls), "failures": dict(self.failures)}
+
+    def handle(self, params):
+        command = params.get("Command", "")
+        if self.allowed_ips and params.get("ClientIp") not in self.allowed_ips:
+            return api_response(command, errors=[(ERROR_WHITELIST,
+                                                  f"Invalid request IP: {params.get('ClientIp', '')}")])
+
+        domain = f"{params.get('SLD', '')}.{params.get('TLD', '')}".lower()
+        if command == "namecheap.domains.dns.getHosts":
+            return self.get_hosts(command, domain)
+        if command == "namecheap.domains.dns.setHosts":
+            return self.set_hosts(command, domain, params)
+        return api_response(command, errors=[(ERROR_INVALID_COMMAND, f"Invalid command: {command}")])
+
+    def get_hosts(self, command, domain):
+        with self.lock:
+            hosts, email_type = self.domains.get(domain, ([], "NONE"))
+        hosts_xml = "".join(
+            f'<host HostId="{i}" Name={quoteattr(h["Name"])} Type={quoteattr(h["Type"])} '
+            f'Address={quoteattr(h["Address"])} MXPref="10" TTL="1800" />'
+            for i, h in enumerate(hosts, 1))
+        body = (f'<DomainDNSGetHostsResult Domain={quoteattr(domain)} EmailType={quoteattr(email_type)} '
+                f'IsUsingOurDNS="true">{hosts_xml}</DomainDNSGetHostsResult>')
+        return api_response(command, body)
+
+    def set_hosts(self, command, domain, params):
+        hosts = []
+        i = 1
+        while f"HostName{i}" in params:
+            hosts.append({"Name": params[f"HostName{i}"],
+                          "Type": params.get(f"RecordType{i}", ""),
+                          "Address": params.get(f"Address{i}", "")})
+            i += 1
+        email_type = params.get("EmailType", "NONE").upper()
+        with self.lock:
+            self.domains[domain] = (hosts, email_type)
+        body = f'<DomainDNSSetHostsResult Domain={quoteattr(domain)} IsSuccess="true" />'
+        return api_response(command, body)
+
+
+class FakeNamecheapHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1, чтобы клиенты могли держать keep-alive соединения
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело уходят отдельными send; без TCP_NODELAY ответ ждет delayed ACK клиента (~40 мс)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        params = dict(parse_qsl(urlparse(self.path).query, keep_blank_values=True))
+        status, text = self.server.state.respond(params)
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Клиент отменил запрос (stop, отмена задач asyncio) - это не ошибка сервера
+        pass
+
+
+class FakeNamecheapServer:
+    """Запускает FakeNamecheapState на локальном порту в фоновом потоке"""
+
+    def __init__(self, host="127.0.0.1", port=0, state=None):
+        self.state = state or FakeNamecheapState()
+        self.httpd = FakeHTTPServer((host, port), FakeNamecheapHandler)
+        self.httpd.state = self.state
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/xml.response"
+
+    def start(self):
+        self.thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Namecheap API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--allowed-ip", action="append", default=[],
+                        help="only accept this ClientIp (repeatable); others get error 1011150")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, 0..JITTER seconds")
+    parser.add_argument("--rate-limit", type=int, default=0,
+                        help="calls allowed per --rate-period; over quota returns error 500000 (0 = unlimited)")
+    parser.add_argument("--rate-period", type=float, default=60.0)
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="fraction of HTTP 503 responses")
+    parser.add_argument("--api-error-rate", type=float, default=0.0, help="fraction of Status=ERROR responses")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible failure injection")
+    args = parser.parse_args(argv)
+
+    state = FakeNamecheapState(args.allowed_ip, latency=args.latency, jitter=args.jitter,
+                               rate_limit=args.rate_limit, rate_period=args.rate_period,
+                               http_error_rate=args.http_error_rate, api_error_rate=args.api_error_rate,
+                               seed=args.seed)
+    server = FakeNamecheapServer(args.host, args.port, state)
+    print(f"Fake Namecheap API listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"Stats: {state.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Таблица Google Sheets в памяти для замеров и запусков без сети.
+
+Повторяет ту часть gspread, которой пользуются sheets.py и DNSEngine
+(values_batch_get, batch_get, batch_update, get_lastUpdateTime), и
+считает чтения и записи. FakeSheetsClient подставляется в DNSEngine
+вместо SheetsClient:
+
+    spreadsheet = FakeSpreadsheet.synthetic(1000)
+    engine = DNSEngine(settings, sheets_client=FakeSheetsClient(spreadsheet))
+"""
+import re
+from threading import Lock
+
+from sheets import DOMAINS_SHEET, GSUITES_SHEET
+
+DOMAINS_HEADER = ["Domain", "Redirect", "Tracking", "SPF", "DMARC", "Mail Settings"]
+GSUITES_HEADER = ["Domain", "DMARC"]
+CELL_RE = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def a1_to_rowcol(cell):
+    match = CELL_RE.match(cell)
+    if not match:
+        raise ValueError(f"Unsupported range: {cell}")
+    col = 0
+    for letter in match.group(1):
+        col = col * 26 + ord(letter) - ord("A") + 1
+    return int(match.group(2)), col
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, values):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.values = values
+
+    def batch_get(self, ranges, **kwargs):
+        """Поддерживает только диапазоны, которые читает SheetIndex: "A:A" и "1:1" """
+        self.spreadsheet.count("reads")
+        out = []
+        with self.spreadsheet.lock:
+            for cell_range in ranges:
+                if cell_range == "A:A":
+                    out.append([[row[0]] if row and row[0] else [] for row in self.values])
+                elif cell_range == "1:1":
+                    out.append([list(self.values[0])] if self.values else [])
+                else:
+                    raise ValueError(f"Unsupported range: {cell_range}")
+        return out
+
+    def batch_update(self, data, **kwargs):
+        self.spreadsheet.count("writes")
+        with self.spreadsheet.lock:
+            for update in data:
+                row, col = a1_to_rowcol(update["range"])
+                for offset, value in enumerate(update["values"][0]):
+                    while len(self.values) < row:
+                        self.values.append([])
+                    cells = self.values[row - 1]
+                    while len(cells) < col + offset:
+                        cells.append("")
+                    cells[col + offset - 1] = value
+            self.spreadsheet.modified += 1
+
+
+class FakeSpreadsheet:
+    """Таблица с листами {название: значения}; modified растет при каждой записи"""
+
+    def __init__(self, sheets, spreadsheet_id="fake"):
+        self.id = spreadsheet_id
+        self.lock = Lock()
+        self.counters = {"reads": 0, "writes": 0, "drive_calls": 0}
+        self.modified = 1
+        self.sheets = {title: FakeWorksheet(self, title, values) for title, values in sheets.items()}
+
+    @classmethod
+    def synthetic(cls, count, dmarc="v=DMARC1; p=none", spreadsheet_id="fake"):
+        """Листы Domains и G-Suites на count доменов вида benchN.com"""
+        domains = [f"bench{i}.com" for i in range(1, count + 1)]
+        return cls({
+            DOMAINS_SHEET: [list(DOMAINS_HEADER)] + [[domain] + [""] * (len(DOMAINS_HEADER) - 1)
+                                                     for domain in domains],
+            GSUITES_SHEET: [list(GSUITES_HEADER)] + [[domain, dmarc] for domain in domains]
+        }, spreadsheet_id)
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def worksheet(self, title):
+        return self.sheets[title]
+
+    def values_batch_get(self, ranges, params=None):
+        self.count("reads")
+        value_ranges = []
+        with self.lock:
+            for cell_range in ranges:
+                title = cell_range.strip("'").replace("''", "'")
+                if title not in self.sheets:
+                    raise ValueError(f"Unable to parse range: {cell_range}")
+                value_ranges.append({"range": cell_range,
+                                     "values": [list(row) for row in self.sheets[title].values]})
+        return {"valueRanges": value_ranges}
+
+    def get_lastUpdateTime(self):
+        self.count("drive_calls")
+        with self.lock:
+            return f"fake-{self.modified}"
+
+
+class FakeSheetsClient:
+    """Замена SheetsClient: всегда отдает одну и ту же FakeSpreadsheet"""
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self.authorized = False
+
+    def update_keyfile(self, keyfile_path):
+        pass
+
+    def authorize(self):
+        authorized = not self.authorized
+        self.authorized = True
+        return self, authorized
+
+    def open_by_url(self, url):
+        return self.spreadsheet
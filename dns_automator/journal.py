@@ -0,0 +1,89 @@
+import json
+import os
+import time
+import uuid
+from threading import Lock
+
+JOURNAL_FILE = "run_journal_{operation}.jsonl"
+
+
+class RunJournal:
+    """Журнал выполненных операций по доменам (JSON Lines, только дозапись).
+
+    На каждую операцию (setup/verify) свой файл. Новый запуск начинает
+    файл заново, продолжение (resume) дописывает в него же и пропускает
+    домены, для которых шаг уже записан. Успешное завершение запуска
+    отмечается событием finish - такой запуск продолжать нечего.
+    """
+
+    def __init__(self, directory, operation):
+        self.operation = operation
+        self.path = os.path.join(directory, JOURNAL_FILE.format(operation=operation))
+        self.lock = Lock()
+        self.run_id = None
+        self.completed = {}
+        self.file = None
+
+    def read_events(self):
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # Последняя строка могла не дописаться при падении
+                    continue
+        return events
+
+    def has_unfinished_run(self):
+        events = self.read_events()
+        return bool(events) and events[0].get("event") == "start" and not any(
+            event.get("event") == "finish" for event in events)
+
+    def start(self, resume=False, **info):
+        """Открывает журнал; при resume загружает уже выполненные шаги.
+
+        Возвращает True, если действительно продолжаем прерванный запуск.
+        """
+        resumed = False
+        self.completed = {}
+        if resume and self.has_unfinished_run():
+            events = self.read_events()
+            self.run_id = events[0].get("run_id")
+            for event in events:
+                if event.get("event") == "step":
+                    self.completed[(event["phase"], event["domain"])] = event
+            resumed = True
+            self.file = open(self.path, "a", encoding="utf-8")
+            self.append({"event": "resume", "completed": len(self.completed)})
+        else:
+            self.run_id = uuid.uuid4().hex
+            self.file = open(self.path, "w", encoding="utf-8")
+            self.append({"event": "start", "operation": self.operation, **info})
+        return resumed
+
+    def append(self, event):
+        event = {"run_id": self.run_id, "ts": time.time(), **event}
+        with self.lock:
+            self.file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def record(self, phase, domain, **data):
+        event = {"event": "step", "phase": phase, "domain": domain, **data}
+        self.completed[(phase, domain)] = event
+        self.append(event)
+
+    def done(self, phase, domain):
+        return self.completed.get((phase, domain))
+
+    def finish(self):
+        self.append({"event": "finish"})
+        self.close()
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
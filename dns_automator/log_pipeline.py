@@ -0,0 +1,100 @@
+import queue
+import time
+import tkinter as tk
+from threading import Lock
+
+LOG_FILE = "dns_automator.log"
+DEFAULT_MAX_LINES = 5000
+DRAIN_INTERVAL_MS = 100
+DRAIN_BATCH = 1000
+# Маркер в очереди: очистить виджет от всего, что пришло раньше
+CLEAR = object()
+
+
+class LogPipeline:
+    """Лог из рабочих потоков в текстовый виджет без root.update() на каждую строку.
+
+    put() только кладет строку в очередь (и дописывает ее в файл), а
+    виджет обновляется в потоке Tk через root.after пачками не чаще
+    раза в DRAIN_INTERVAL_MS. В виджете хранятся последние max_lines
+    строк, полный лог остается в файле. Если файл открыть нельзя (папка
+    только для чтения), лог пишется только в виджет, а причина остается
+    в file_error.
+    """
+
+    def __init__(self, root, widget, max_lines=DEFAULT_MAX_LINES, log_path=None):
+        self.root = root
+        self.widget = widget
+        self.max_lines = max_lines
+        self.queue = queue.SimpleQueue()
+        self.file_lock = Lock()
+        self.file = None
+        self.file_error = None
+        if log_path:
+            try:
+                self.file = open(log_path, "a", encoding="utf-8")
+            except OSError as e:
+                self.file_error = str(e)
+        self.after_id = None
+
+    def start(self):
+        self.after_id = self.root.after(DRAIN_INTERVAL_MS, self.drain)
+        return self
+
+    def put(self, message):
+        self.queue.put(message)
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self.file_lock:
+            if self.file:
+                self.file.write(f"{stamp} {message.lstrip()}\n")
+
+    def clear(self):
+        """Очищает виджет в потоке Tk после строк, уже стоящих в очереди"""
+        self.queue.put(CLEAR)
+
+    def drain(self):
+        """Переносит накопленные строки в виджет одной вставкой (поток Tk)"""
+        lines = []
+        taken = 0
+        cleared = False
+        try:
+            while taken < DRAIN_BATCH:
+                message = self.queue.get_nowait()
+                taken += 1
+                if message is CLEAR:
+                    lines = []
+                    cleared = True
+                else:
+                    lines.append(message)
+        except queue.Empty:
+            pass
+
+        if cleared:
+            self.widget.delete("1.0", tk.END)
+        if lines:
+            self.widget.insert(tk.END, "\n".join(lines) + "\n")
+            self.trim()
+            self.widget.see(tk.END)
+            if self.file:
+                with self.file_lock:
+                    self.file.flush()
+
+        # Если очередь не разобрали целиком, продолжаем сразу после отрисовки
+        self.after_id = self.root.after(1 if taken == DRAIN_BATCH else DRAIN_INTERVAL_MS, self.drain)
+
+    def trim(self):
+        if not self.max_lines:
+            return
+        line_count = int(self.widget.index("end-1c").split(".")[0])
+        excess = line_count - self.max_lines
+        if excess > 0:
+            self.widget.delete("1.0", f"{excess + 1}.0")
+
+    def close(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        with self.file_lock:
+            if self.file:
+                self.file.close()
+                self.file = None
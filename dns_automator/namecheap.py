@@ -0,0 +1,147 @@
+BASE_URL = "https://api.namecheap.com/xml.response"
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 60
+
+WHITELIST_ERROR_NUMBER = "1011150"
+PARSE_CHUNK_SIZE = 64 * 1024
+
+
+def local_name(tag):
+    return tag.rpartition("}")[2]
+
+
+class NamecheapResponse:
+    """Ответ Namecheap API, разобранный один раз потоково; ошибка разбора - parse_error, а не исключение"""
+
+    def __init__(self, size=0):
+        self.size = size
+        self.status = None
+        self.errors = []
+        self.hosts = []
+        self.email_type = "UNKNOWN"
+        self.parse_error = None
+        self.preview = ""
+
+    @classmethod
+    def parse(cls, text):
+        import xml.etree.ElementTree as ET
+
+        response = cls(len(text))
+        parser = ET.XMLPullParser(events=("start", "end"))
+        try:
+            for offset in range(0, len(text), PARSE_CHUNK_SIZE):
+                parser.feed(text[offset:offset + PARSE_CHUNK_SIZE])
+                response.consume(parser.read_events())
+            parser.close()
+            response.consume(parser.read_events())
+        except ET.ParseError as e:
+            response.parse_error = str(e)
+            response.preview = text[:200]
+        return response
+
+    def consume(self, events):
+        for event, elem in events:
+            tag = local_name(elem.tag)
+            if event == "start":
+                if tag == "ApiResponse":
+                    self.status = elem.get("Status")
+                elif tag == "DomainDNSGetHostsResult":
+                    self.email_type = elem.get("EmailType", "UNKNOWN")
+            elif tag == "host":
+                self.hosts.append({
+                    "Type": elem.get("Type"),
+                    "Name": elem.get("Name"),
+                    "Address": elem.get("Address"),
+                    "TTL": elem.get("TTL")
+                })
+                elem.clear()
+            elif tag == "Error":
+                self.errors.append((elem.get("Number", ""), elem.text or ""))
+                elem.clear()
+
+    @property
+    def ok(self):
+        return self.status == "OK"
+
+    @property
+    def whitelist_error(self):
+        """Ошибка 1011150: IP клиента не в whitelist Namecheap"""
+        return any(number == WHITELIST_ERROR_NUMBER and "Invalid request IP" in text
+                   for number, text in self.errors)
+
+    @property
+    def ip_mismatch(self):
+        if self.parse_error:
+            return "invalid ip address" in self.preview.lower()
+        return any("invalid ip address" in text.lower() for _, text in self.errors)
+
+    def error_message(self):
+        if self.parse_error:
+            return f"Invalid API response: {self.preview}..."
+        return "\n".join(f"Code {number}: {text}" for number, text in self.errors) or "Unknown API error"
+
+
+class NamecheapClient:
+    """Долгоживущий HTTP клиент Namecheap API с пулом keep-alive соединений на pool_size потоков"""
+
+    def __init__(self, api_user="", api_key="", username="", client_ip="", base_url=BASE_URL,
+                 pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.update_credentials(api_user, api_key, username, client_ip)
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(api_user=settings.get("api_user", ""),
+                   api_key=settings.get("api_key", ""),
+                   username=settings.get("username", ""),
+                   client_ip=settings.get("client_ip", "").strip(),
+                   base_url=settings.get("api_base_url") or BASE_URL,
+                   pool_size=int(settings.get("http_pool_size") or DEFAULT_POOL_SIZE),
+                   connect_timeout=float(settings.get("connect_timeout") or DEFAULT_CONNECT_TIMEOUT),
+                   read_timeout=float(settings.get("read_timeout") or DEFAULT_READ_TIMEOUT))
+
+    def update_credentials(self, api_user, api_key, username, client_ip):
+        self.api_user = api_user
+        self.api_key = api_key
+        self.username = username
+        self.client_ip = client_ip
+
+    def update_from_settings(self, settings):
+        self.update_credentials(settings.get("api_user", ""), settings.get("api_key", ""),
+                                settings.get("username", ""), settings.get("client_ip", "").strip())
+
+    def call(self, command, params):
+        """Выполняет команду API и возвращает текст XML ответа.
+
+        Ошибки сети и HTTP статусы пробрасываются как requests.RequestException.
+        """
+        payload = {
+            "ApiUser": self.api_user,
+            "ApiKey": self.api_key,
+            "UserName": self.username,
+            "ClientIp": self.client_ip,
+            "Command": command
+        }
+        payload.update(params)
+
+        r = self.session.get(self.base_url, params=payload, timeout=self.timeout)
+        r.raise_for_status()
+        return r.text
+
+    def get(self, url, timeout=10):
+        """GET произвольного URL через тот же пул (например, определение IP)"""
+        return self.session.get(url, timeout=timeout)
+
+    def close(self):
+        self.session.close()
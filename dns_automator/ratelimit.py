@@ -0,0 +1,169 @@
+import json
+import os
+import time
+from threading import Lock
+
+# Документированные лимиты Namecheap API на одного пользователя
+NAMECHEAP_PER_MINUTE = 50
+NAMECHEAP_PER_HOUR = 700
+NAMECHEAP_PER_DAY = 8000
+DEFAULT_BURST = 10
+RATE_LIMIT_STATE_FILE = "rate_limit_state.json"
+
+
+class TokenBucket:
+    """Классическое ведро токенов: capacity токенов, пополнение rate токенов в секунду"""
+
+    def __init__(self, capacity, rate, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Сколько секунд ждать до появления одного токена (0 - можно сразу)"""
+        self.refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """Общий лимитер для всех вызовов Namecheap API.
+
+    Держит по ведру на каждое окно квоты (минута/час/день); вызов проходит,
+    только когда токен есть во всех ведрах. Короткие всплески ограничены
+    burst, а средняя скорость - квотами. Потокобезопасен.
+
+    С path остаток токенов сохраняется в файл и подхватывается следующим
+    процессом: иначе каждый запуск cli.py начинал бы с полными часовым и
+    дневным ведрами и два запуска за час превышали бы квоту.
+    """
+
+    def __init__(self, per_minute=NAMECHEAP_PER_MINUTE, per_hour=NAMECHEAP_PER_HOUR,
+                 per_day=NAMECHEAP_PER_DAY, burst=DEFAULT_BURST, clock=time.monotonic, path=None):
+        self.clock = clock
+        self.lock = Lock()
+        self.path = path
+        self.buckets = {}
+        if per_minute:
+            self.buckets["minute"] = TokenBucket(max(1, min(burst or per_minute, per_minute)), per_minute / 60.0, clock)
+        if per_hour:
+            self.buckets["hour"] = TokenBucket(per_hour, per_hour / 3600.0, clock)
+        if per_day:
+            self.buckets["day"] = TokenBucket(per_day, per_day / 86400.0, clock)
+        self.total_wait = 0.0
+        self.calls = 0
+        if path:
+            self.load()
+
+    @classmethod
+    def from_settings(cls, settings, state_dir=None):
+        """state_dir - папка для RATE_LIMIT_STATE_FILE; None - состояние только в памяти"""
+        return cls(per_minute=int(settings.get("api_rate_per_minute") or 0),
+                   per_hour=int(settings.get("api_rate_per_hour") or 0),
+                   per_day=int(settings.get("api_rate_per_day") or 0),
+                   burst=int(settings.get("api_burst") or 0),
+                   path=os.path.join(state_dir, RATE_LIMIT_STATE_FILE) if state_dir else None)
+
+    def load(self):
+        """Восстанавливает остаток токенов с поправкой на время, прошедшее с сохранения"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            elapsed = max(0.0, time.time() - float(state["saved_at"]))
+            saved = {name: float(tokens) for name, tokens in state["tokens"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return False
+        with self.lock:
+            for name, bucket in self.buckets.items():
+                if name in saved:
+                    bucket.tokens = min(bucket.capacity, saved[name] + elapsed * bucket.rate)
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            for bucket in self.buckets.values():
+                bucket.refill()
+            state = {"saved_at": time.time(),
+                     "tokens": {name: bucket.tokens for name, bucket in self.buckets.items()}}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def try_acquire(self):
+        """Забирает токен, если он есть; иначе возвращает время ожидания"""
+        with self.lock:
+            wait = max((bucket.wait_time() for bucket in self.buckets.values()), default=0.0)
+            if wait > 0:
+                return wait
+            for bucket in self.buckets.values():
+                bucket.consume()
+            self.calls += 1
+            return 0.0
+
+    def acquire(self, stop_event=None, on_wait=None):
+        """Блокирует до получения токена.
+
+        on_wait(seconds) вызывается один раз, если приходится ждать.
+        Возвращает False, если ожидание прервано через stop_event.
+        """
+        notified = False
+        waited = False
+        started = self.clock()
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                break
+            waited = True
+            if not notified and on_wait:
+                on_wait(wait)
+                notified = True
+            # Спим короткими отрезками, чтобы быстро реагировать на stop
+            if stop_event is not None:
+                if stop_event.wait(min(wait, 1.0)):
+                    return False
+            else:
+                time.sleep(min(wait, 1.0))
+        self.add_wait(waited, started)
+        return True
+
+    async def acquire_async(self, on_wait=None):
+        """То же, что acquire, но для asyncio: ждет через asyncio.sleep.
+
+        Отмена задачи (CancelledError) прерывает ожидание без потери токена.
+        """
+        import asyncio
+
+        notified = False
+        waited = False
+        started = self.clock()
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                break
+            waited = True
+            if not notified and on_wait:
+                on_wait(wait)
+                notified = True
+            await asyncio.sleep(min(wait, 1.0))
+        self.add_wait(waited, started)
+        return True
+
+    def add_wait(self, waited, started):
+        """В total_wait идет только реальное ожидание токена, а не время захвата блокировки"""
+        if waited:
+            with self.lock:
+                self.total_wait += self.clock() - started
@@ -0,0 +1,63 @@
+import csv
+import json
+import os
+import time
+from threading import Lock
+
+BASE_FIELDS = ("ts", "operation", "domain", "status", "message", "latency_ms")
+TAIL_FIELDS = ("verified", "diff", "error")
+
+
+class ResultsExporter:
+    """Дописывает результат каждого домена в CSV или JSON Lines сразу после его получения.
+
+    Формат выбирается по расширению (.csv - CSV, иначе JSONL). Каждая
+    строка сбрасывается на диск сразу, поэтому файл можно читать через
+    tail -f во время запуска. Файл дописывается между запусками.
+    """
+
+    def __init__(self, path, check_columns):
+        self.path = path
+        self.check_columns = tuple(check_columns)
+        self.fields = BASE_FIELDS + self.check_columns + TAIL_FIELDS
+        self.is_csv = path.lower().endswith(".csv")
+        self.lock = Lock()
+        write_header = self.is_csv and (not os.path.exists(path) or os.path.getsize(path) == 0)
+        self.file = open(path, "a", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fields) if self.is_csv else None
+        if write_header:
+            self.writer.writeheader()
+            self.file.flush()
+
+    def export(self, operation, domain, result, checks=None, diff=None):
+        """result - словарь update_dns/get_dns_records, checks - колонки проверки"""
+        latency = result.get("latency")
+        row = {
+            "ts": round(time.time(), 3),
+            "operation": operation,
+            "domain": domain,
+            "status": result.get("status"),
+            "message": result.get("message"),
+            "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+            "verified": all(checks.values()) if checks else None,
+            "diff": diff if diff is not None else result.get("diff"),
+            "error": result.get("details")
+        }
+        for name in self.check_columns:
+            row[name] = checks.get(name) if checks else None
+        row = {name: row[name] for name in self.fields}
+
+        with self.lock:
+            if self.file is None:
+                return
+            if self.is_csv:
+                self.writer.writerow({**row, "diff": json.dumps(row["diff"]) if row["diff"] is not None else ""})
+            else:
+                self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
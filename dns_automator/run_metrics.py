@@ -0,0 +1,106 @@
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+METRICS_FILE = "run_metrics_{operation}.json"
+
+# Порядок и подписи фаз в окне итогов и в CLI
+PHASES = (
+    ("sheet_auth", "Sheet auth"),
+    ("sheet_read", "Sheet read"),
+    ("dns_apply", "DNS apply"),
+    ("rate_limit_wait", "Rate-limit wait (all workers)"),
+    ("verification", "Verification"),
+    ("propagation_wait", "Propagation wait"),
+    ("sheet_writeback", "Sheet writeback"),
+)
+
+
+def percentile(sorted_values, fraction):
+    """Перцентиль методом ближайшего ранга; sorted_values не пустой"""
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class RunMetrics:
+    """Время по фазам одного запуска и задержки вызовов Namecheap API.
+
+    Ожидание лимитера и распространения DNS, а также запись в таблицу
+    входят в объемлющие фазы dns_apply/verification, но считаются и
+    отдельно: так видно, что замедлило запуск - Namecheap, Google Sheets
+    или собственный троттлинг. Ожидания суммируются по всем рабочим
+    потокам и могут превышать общее время. Потокобезопасен.
+    """
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.finished = None
+        self.phases = {}
+        self.latencies = []
+        self.lock = Lock()
+
+    def add(self, phase, seconds):
+        with self.lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def record_latency(self, seconds):
+        if seconds is not None:
+            with self.lock:
+                self.latencies.append(seconds)
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    def latency_summary(self):
+        with self.lock:
+            values = sorted(self.latencies)
+        if not values:
+            return {"count": 0, "p50": None, "p95": None, "max": None}
+        return {"count": len(values), "p50": round(percentile(values, 0.5), 4),
+                "p95": round(percentile(values, 0.95), 4), "max": round(values[-1], 4)}
+
+    def summary(self):
+        wall = (self.finished or time.perf_counter()) - self.started
+        with self.lock:
+            phases = {name: round(seconds, 3) for name, seconds in self.phases.items()}
+        return {
+            "operation": self.operation,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "wall_s": round(wall, 3),
+            "phases": phases,
+            "api_latency_s": self.latency_summary()
+        }
+
+    def save(self, directory):
+        path = os.path.join(directory, METRICS_FILE.format(operation=self.operation))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+
+def format_summary(summary):
+    """Строки для окна итогов и CLI"""
+    lines = [f"Total: {summary['wall_s']:.1f}s"]
+    for key, label in PHASES:
+        if key in summary["phases"]:
+            lines.append(f"{label}: {summary['phases'][key]:.1f}s")
+    latency = summary["api_latency_s"]
+    if latency["count"]:
+        lines.append(f"API latency ({latency['count']} calls): p50 {latency['p50'] * 1000:.0f} ms, "
+                     f"p95 {latency['p95'] * 1000:.0f} ms, max {latency['max'] * 1000:.0f} ms")
+    return lines
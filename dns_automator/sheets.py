@@ -0,0 +1,357 @@
+import json
+import os
+import time
+from threading import Lock
+
+DEFAULT_FLUSH_EVERY = 50
+DOMAINS_SHEET = "Domains"
+GSUITES_SHEET = "G-Suites"
+SNAPSHOT_FILE = "sheet_snapshot_{spreadsheet_id}.json"
+SHEETS_SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+
+class SheetsClient:
+    """Авторизованный gspread клиент на всю сессию; заново авторизуется только при смене ключа"""
+
+    def __init__(self, keyfile_path=""):
+        self.keyfile_path = keyfile_path
+        self.key_mtime = None
+        self.client = None
+        self.spreadsheets = {}
+        self.lock = Lock()
+
+    def authorize(self):
+        """Возвращает (клиент, True если авторизовались только что)"""
+        with self.lock:
+            key_mtime = os.path.getmtime(self.keyfile_path)
+            if self.client is not None and key_mtime == self.key_mtime:
+                return self.client, False
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+
+            creds = ServiceAccountCredentials.from_json_keyfile_name(self.keyfile_path, SHEETS_SCOPE)
+            self.client = gspread.authorize(creds)
+            self.key_mtime = key_mtime
+            self.spreadsheets = {}
+            return self.client, True
+
+    def update_keyfile(self, keyfile_path):
+        with self.lock:
+            if keyfile_path != self.keyfile_path:
+                self.keyfile_path = keyfile_path
+                self.client = None
+
+    def open_by_url(self, url):
+        client, _ = self.authorize()
+        with self.lock:
+            if url not in self.spreadsheets:
+                self.spreadsheets[url] = client.open_by_url(url)
+            return self.spreadsheets[url]
+
+
+def a1_cell(row, col):
+    """Адрес ячейки в A1 нотации (как gspread.utils.rowcol_to_a1, без импорта gspread)"""
+    letters = ""
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return f"{letters}{row}"
+
+
+def sheet_range(sheet_name):
+    """Диапазон "весь лист" в A1 нотации с экранированием кавычек"""
+    return "'{}'".format(sheet_name.replace("'", "''"))
+
+
+def normalize_header(name):
+    return str(name).strip().lower()
+
+
+class SheetTable:
+    """Значения листа из get_all_values с картой заголовков, построенной один раз.
+
+    Ячейки читаются по номеру колонки из исходных списков, без словаря
+    на каждую строку; заголовки сравниваются без учета регистра и пробелов.
+    """
+
+    def __init__(self, values):
+        self.headers = values[0] if values else []
+        self.rows = values[1:]
+        self.columns = {}
+        for i, name in enumerate(self.headers):
+            self.columns.setdefault(normalize_header(name), i)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, name):
+        """Значения колонки по всем строкам; "" для пустых ячеек и отсутствующей колонки"""
+        index = self.columns.get(normalize_header(name))
+        if index is None:
+            return [""] * len(self.rows)
+        return [row[index] if index < len(row) else "" for row in self.rows]
+
+
+class SheetIndex:
+    """Индекс листа Domains: домен -> номера строк, заголовок -> номер колонки.
+
+    Строится один раз из get_all_values в начале запуска. Если строки
+    вставили или удалили посреди запуска, refresh замечает это по колонке
+    доменов и заголовку (один batch_get на две узкие области вместо
+    выгрузки всего листа) и перестраивает индекс.
+    """
+
+    def __init__(self, values):
+        self.rebuild([row[0] if row else "" for row in values], values[0] if values else [])
+
+    def rebuild(self, first_column, headers):
+        self.first_column = self.trim(first_column)
+        self.headers = self.trim(headers)
+        self.columns = {}
+        for i, name in enumerate(self.headers, 1):
+            if name:
+                self.columns.setdefault(name, i)
+        self.rows = {}
+        for i, value in enumerate(self.first_column[1:], start=2):
+            if value:
+                self.rows.setdefault(value.lower(), []).append(i)
+        self.stale = False
+
+    @staticmethod
+    def trim(values):
+        values = list(values)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def invalidate(self):
+        self.stale = True
+
+    def refresh(self, worksheet):
+        """Сверяет индекс с листом; возвращает True, если пришлось перестроить"""
+        column, header = worksheet.batch_get(["A:A", "1:1"])
+        first_column = self.trim(row[0] if row else "" for row in column)
+        headers = self.trim(header[0] if header else [])
+        if self.stale or first_column != self.first_column or headers != self.headers:
+            self.rebuild(first_column, headers)
+            return True
+        return False
+
+    def column(self, name):
+        return self.columns.get(name)
+
+    def rows_for(self, domain):
+        return self.rows.get(domain.lower(), [])
+
+
+class ResultsWriter:
+    """Копит результаты проверки и пишет их в лист Domains пачками.
+
+    Вместо update_cell на каждую колонку каждого домена все ячейки
+    накопленных доменов уходят одним batch_update. flush_every задает,
+    после скольких доменов сбрасывать пачку (0 - только в конце запуска),
+    чтобы при остановке или падении часть результатов уже была в таблице.
+    Строки ищутся по SheetIndex; с check_index индекс сверяется с листом
+    перед каждой записью. inventory (если передан) узнает о каждой записи,
+    чтобы снимок таблицы не устаревал из-за собственных изменений.
+    on_written(results) вызывается только после успешной записи пачки.
+    Время записи учитывается в фазе sheet_writeback metrics (RunMetrics).
+    """
+
+    def __init__(self, worksheet, index, flush_every=DEFAULT_FLUSH_EVERY, check_index=True, log=print,
+                 inventory=None, metrics=None, on_written=None):
+        self.worksheet = worksheet
+        self.index = index
+        self.flush_every = flush_every
+        self.check_index = check_index
+        self.log = log
+        self.inventory = inventory
+        self.metrics = metrics
+        self.on_written = on_written
+        self.pending = {}
+
+    def add(self, domain, verification_results):
+        self.pending[domain.lower()] = verification_results
+        if self.flush_every and len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def build_updates(self):
+        updates = []
+        for domain, results in self.pending.items():
+            for row in self.index.rows_for(domain):
+                for col_name, value in results.items():
+                    col = self.index.column(col_name)
+                    if col:
+                        updates.append({
+                            "range": a1_cell(row, col),
+                            "values": [["TRUE" if value else "FALSE"]]
+                        })
+        return updates
+
+    def flush(self):
+        if not self.pending:
+            return
+        count = len(self.pending)
+        batch = self.pending
+        started = time.perf_counter()
+        try:
+            if (self.check_index or self.index.stale) and self.index.refresh(self.worksheet):
+                self.log("[Google Sheets] Domains sheet layout changed, row index rebuilt")
+            updates = self.build_updates()
+            if updates:
+                if self.inventory is not None:
+                    self.inventory.before_write()
+                self.worksheet.batch_update(updates, value_input_option="USER_ENTERED")
+                if self.inventory is not None:
+                    self.inventory.after_write()
+            self.log(f"[Google Sheets] Results written for {count} domains ({len(updates)} cells)")
+        except Exception as e:
+            self.log(f"[VERIFICATION ERROR] Failed to update sheet for {count} domains: {str(e)}")
+            return
+        finally:
+            self.pending = {}
+            if self.metrics is not None:
+                self.metrics.add("sheet_writeback", time.perf_counter() - started)
+        if self.on_written is not None:
+            self.on_written(batch)
+
+
+class SnapshotCache:
+    """Снимки листов на диске, действительные, пока не изменился modifiedTime таблицы в Drive"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, spreadsheet_id):
+        return os.path.join(self.directory, SNAPSHOT_FILE.format(spreadsheet_id=spreadsheet_id))
+
+    def load(self, spreadsheet_id, modified_time):
+        try:
+            with open(self.path(spreadsheet_id), "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get("modified_time") != modified_time:
+            return None
+        return snapshot
+
+    def save(self, spreadsheet_id, modified_time, domains_values, gsuites_values):
+        path = self.path(spreadsheet_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"modified_time": modified_time, "domains": domains_values,
+                       "gsuites": gsuites_values}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class Inventory:
+    """Содержимое листов Domains и G-Suites, загруженное одним запросом.
+
+    load берет оба листа одним values_batch_get (один round trip вместо
+    worksheet() + get_all_values() на каждый лист). Если один из листов
+    недоступен, листы читаются по отдельности, и ошибка сохраняется в
+    domains_error / gsuites_error. Объект листа Domains нужен только для
+    записи результатов, поэтому запрашивается лениво.
+
+    С snapshot листы не скачиваются вовсе, если modifiedTime таблицы
+    совпадает с сохраненным снимком. Собственная запись результатов
+    тоже меняет modifiedTime; если до нее таблица не менялась, снимок
+    переносится на новое время (before_write/after_write).
+    """
+
+    def __init__(self, spreadsheet, domains_values=None, gsuites_values=None,
+                 domains_error=None, gsuites_error=None, snapshot=None, modified_time=None,
+                 from_snapshot=False):
+        self.spreadsheet = spreadsheet
+        self.domains_values = domains_values
+        self.gsuites_values = gsuites_values
+        self.snapshot = snapshot
+        self.modified_time = modified_time
+        self.from_snapshot = from_snapshot
+        self.domains = SheetTable(domains_values or [])
+        self.index = SheetIndex(domains_values or [])
+        self.gsuites = SheetTable(gsuites_values or []) if gsuites_values is not None else None
+        self.domains_error = domains_error
+        self.gsuites_error = gsuites_error
+        self._domains_worksheet = None
+
+    @staticmethod
+    def fetch(spreadsheet, sheet_names):
+        response = spreadsheet.values_batch_get([sheet_range(name) for name in sheet_names])
+        return [value_range.get("values", []) for value_range in response.get("valueRanges", [])]
+
+    @classmethod
+    def load(cls, spreadsheet, snapshot=None):
+        modified_time = None
+        if snapshot is not None:
+            try:
+                modified_time = spreadsheet.get_lastUpdateTime()
+                cached = snapshot.load(spreadsheet.id, modified_time)
+            except Exception:
+                modified_time, cached = None, None
+            if cached:
+                return cls(spreadsheet, cached["domains"], cached["gsuites"], snapshot=snapshot,
+                           modified_time=modified_time, from_snapshot=True)
+
+        try:
+            domains_values, gsuites_values = cls.fetch(spreadsheet, [DOMAINS_SHEET, GSUITES_SHEET])
+        except Exception:
+            pass
+        else:
+            inventory = cls(spreadsheet, domains_values, gsuites_values, snapshot=snapshot,
+                            modified_time=modified_time)
+            inventory.save_snapshot()
+            return inventory
+
+        # Пакетный запрос отклонен целиком - выясняем, какой лист недоступен
+        loaded = {}
+        errors = {}
+        for name in (DOMAINS_SHEET, GSUITES_SHEET):
+            try:
+                loaded[name] = cls.fetch(spreadsheet, [name])[0]
+            except Exception as e:
+                errors[name] = str(e)
+        return cls(spreadsheet, loaded.get(DOMAINS_SHEET), loaded.get(GSUITES_SHEET),
+                   domains_error=errors.get(DOMAINS_SHEET), gsuites_error=errors.get(GSUITES_SHEET))
+
+    def save_snapshot(self):
+        if self.snapshot is None or self.modified_time is None:
+            return
+        try:
+            self.snapshot.save(self.spreadsheet.id, self.modified_time, self.domains_values, self.gsuites_values)
+        except Exception:
+            # Снимок - только ускорение, без него просто скачаем листы в следующий раз
+            pass
+
+    def before_write(self):
+        """Перед своей записью: если таблицу меняли после загрузки, снимок больше не переносим"""
+        if self.modified_time is None:
+            return
+        try:
+            if self.spreadsheet.get_lastUpdateTime() != self.modified_time:
+                self.modified_time = None
+        except Exception:
+            self.modified_time = None
+
+    def after_write(self):
+        """После своей записи переносим снимок на новый modifiedTime.
+
+        Запись касается только колонок результатов, а не колонки доменов,
+        заголовков или G-Suites, поэтому содержимое снимка остается верным.
+        """
+        if self.modified_time is None:
+            return
+        try:
+            self.modified_time = self.spreadsheet.get_lastUpdateTime()
+        except Exception:
+            self.modified_time = None
+            return
+        self.save_snapshot()
+
+    def domain_cells(self):
+        return self.domains.column("Domain")
+
+    def domains_worksheet(self):
+        if self._domains_worksheet is None:
+            self._domains_worksheet = self.spreadsheet.worksheet(DOMAINS_SHEET)
+        return self._domains_worksheet
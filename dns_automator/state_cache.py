@@ -0,0 +1,67 @@
+import hashlib
+import json
+import sqlite3
+import time
+from threading import Lock
+
+STATE_CACHE_FILE = "dns_state.sqlite3"
+
+
+def desired_state_hash(normalized_hosts, email_type, mail_enabled):
+    """Хэш желаемого состояния домена: записи setHosts, EmailType и флаг почты"""
+    payload = json.dumps({
+        "hosts": sorted(normalized_hosts),
+        "email_type": email_type.upper(),
+        "mail_enabled": bool(mail_enabled)
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StateCache:
+    """SQLite хранилище последнего примененного и проверенного состояния доменов.
+
+    Домен попадает сюда, когда прошли все колонки, достижимые при
+    текущих настройках (DNSEngine.attainable_checks); колонки, которые
+    при таких настройках пройти не могут, не учитываются. Если хоть одна
+    достижимая колонка не прошла, запись удаляется, и следующий запуск
+    снова применит настройки к этому домену.
+    """
+
+    def __init__(self, path=STATE_CACHE_FILE):
+        self.path = path
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS domain_state ("
+            " domain TEXT PRIMARY KEY,"
+            " desired_hash TEXT NOT NULL,"
+            " verified_at REAL NOT NULL)")
+        self.conn.commit()
+
+    def load(self):
+        """Все сохраненные хэши одним запросом: {domain: desired_hash}"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT domain, desired_hash FROM domain_state"))
+
+    def mark_verified(self, domain, desired_hash):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO domain_state (domain, desired_hash, verified_at) VALUES (?, ?, ?)",
+                (domain.lower(), desired_hash, time.time()))
+            self.conn.commit()
+
+    def forget(self, domain):
+        with self.lock:
+            self.conn.execute("DELETE FROM domain_state WHERE domain = ?", (domain.lower(),))
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM domain_state")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули приложения импортируются плоско (from engine import ...), как при запуске из dns_automator
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,217 @@
+"""Проверка dns_verify против локального FakeDNSServer, без сети"""
+import struct
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+import pytest
+
+from dns_verify import (CLASS_IN, FLAG_RESPONSE, TYPE_CODES, DNSQueryError, DNSResolver, DNSVerifier,
+                        decode_rdata, email_type_from_mx, parse_response, read_name)
+from engine import CHECK_COLUMNS, DNSEngine, build_redirect_url
+from fake_dns import GMAIL_MX, FakeDNSServer, encode_rdata, static_zone
+
+DOMAIN = "example.com"
+CUSTOMER = "https://customer.example/"
+SPF = "v=spf1 include:_spf.google.com ~all"
+DMARC = "v=DMARC1; p=none; rua=mailto:dmarc@example.com"
+
+
+def compressed_response(query_id):
+    """Ответ с указателями сжатия: имя ответа и хвост CNAME ссылаются на вопрос"""
+    question = b"\x07example\x03com\x00" + struct.pack(">HH", TYPE_CODES["CNAME"], CLASS_IN)
+    header = struct.pack(">HHHHHH", query_id, FLAG_RESPONSE, 1, 1, 0, 0)
+    # www + указатель на example.com (смещение 12 - начало вопроса)
+    rdata = b"\x03www\xc0\x0c"
+    answer = b"\xc0\x0c" + struct.pack(">HHIH", TYPE_CODES["CNAME"], CLASS_IN, 60, len(rdata)) + rdata
+    return header + question + answer
+
+
+def test_read_name_follows_compression_pointers():
+    data = compressed_response(1)
+    assert read_name(data, 12) == (DOMAIN, 12 + 13)
+    answer_offset = 12 + 13 + 4
+    # После указателя чтение продолжается сразу за ним, а не за целевым именем
+    assert read_name(data, answer_offset) == (DOMAIN, answer_offset + 2)
+
+
+def test_parse_response_decodes_compressed_answer():
+    rcode, truncated, answers = parse_response(compressed_response(7), 7)
+    assert (rcode, truncated) == (0, False)
+    assert answers == [(DOMAIN, "CNAME", "www.example.com")]
+
+
+def test_parse_response_rejects_foreign_id():
+    with pytest.raises(DNSQueryError):
+        parse_response(compressed_response(7), 8)
+
+
+def test_read_name_detects_pointer_loop():
+    data = b"\0" * 12 + b"\xc0\x0c"
+    with pytest.raises(DNSQueryError):
+        read_name(data, 12)
+
+
+def test_txt_strings_are_joined():
+    value = "v=DKIM1; p=" + "A" * 400
+    rdata = encode_rdata("TXT", value)
+    # Больше 255 байт - несколько строк <длина><байты>
+    assert rdata[0] == 255
+    assert decode_rdata(rdata, 0, len(rdata), "TXT") == value
+
+
+@pytest.mark.parametrize("values, expected", [
+    ([], "NONE"),
+    (GMAIL_MX, "GMAIL"),
+    (["1 ASPMX.L.GOOGLE.COM.", "10 alt1.aspmx.l.googlemail.com"], "GMAIL"),
+    (["1 aspmx.l.google.com", "10 mx.other-provider.net"], "MX"),
+])
+def test_email_type_from_mx(values, expected):
+    assert email_type_from_mx(values) == expected
+
+
+def zone(dmarc=DMARC, mx=GMAIL_MX, spf=SPF):
+    return {
+        (DOMAIN, "TXT"): [spf, "google-site-verification=abc"],
+        (DOMAIN, "MX"): mx,
+        (f"_dmarc.{DOMAIN}", "TXT"): [dmarc],
+        (f"inst.{DOMAIN}", "CNAME"): ["prox.itrackly.com."],
+        # DKIM длиннее 255 байт приходит несколькими строками
+        (f"google._domainkey.{DOMAIN}", "TXT"): ["v=DKIM1; p=" + "B" * 300],
+    }
+
+
+@pytest.fixture
+def dns_server():
+    with FakeDNSServer(static_zone(zone())) as server:
+        yield server
+
+
+def make_resolver(server, **kwargs):
+    host, port = server.address
+    return DNSResolver(server=host, port=port, timeout=1, **kwargs)
+
+
+def test_resolver_queries_fake_server(dns_server):
+    resolver = make_resolver(dns_server)
+    assert resolver.query(f"inst.{DOMAIN}", "CNAME") == ["prox.itrackly.com"]
+    assert resolver.query(f"google._domainkey.{DOMAIN}", "TXT") == ["v=DKIM1; p=" + "B" * 300]
+    # NXDOMAIN - пустой список, а не ошибка
+    assert resolver.query("missing.example.org", "TXT") == []
+
+
+def test_unresolvable_server_fails_per_query():
+    resolver = DNSResolver(server="dns.invalid", timeout=1)
+    assert resolver.address is None
+    with pytest.raises(DNSQueryError):
+        resolver.query(DOMAIN, "TXT")
+    result = DNSVerifier(resolver, tracking_host="inst").resolve_records({"domain": DOMAIN}, lambda info: [])
+    assert result["status"] == "error"
+
+
+def make_engine(**settings):
+    return DNSEngine({
+        "customer_domain": CUSTOMER, "mail_enabled": True, "spf": SPF,
+        "tracking_host": "inst", "tracking_value": "prox.itrackly.com",
+        **settings
+    }, log=lambda message: None)
+
+
+def redirect_record(domain_info):
+    return [{"Type": "URL301", "Name": "@", "Address": domain_info["redirect_url"], "TTL": None}]
+
+
+def domain_info():
+    return {"domain": DOMAIN, "redirect_url": build_redirect_url(CUSTOMER, DOMAIN)}
+
+
+def test_resolved_records_pass_every_check(dns_server):
+    verifier = DNSVerifier(make_resolver(dns_server), tracking_host="inst")
+    result = verifier.resolve_records(domain_info(), redirect_record)
+    assert result["status"] == "success"
+    assert result["email_type"] == "GMAIL"
+
+    engine = make_engine()
+    engine.dmarc_dict = {DOMAIN: [DMARC]}
+    assert engine.check_domain(domain_info(), result) == dict.fromkeys(CHECK_COLUMNS, True)
+
+
+def test_resolved_records_report_failing_columns():
+    bad = zone(dmarc="v=DMARC1; p=reject", mx=["10 mx.other-provider.net"], spf="v=spf1 -all")
+    with FakeDNSServer(static_zone(bad)) as server:
+        verifier = DNSVerifier(make_resolver(server), tracking_host="inst")
+        result = verifier.resolve_records(domain_info(), lambda info: [])
+
+    engine = make_engine()
+    engine.dmarc_dict = {DOMAIN: [DMARC]}
+    assert engine.check_domain(domain_info(), result) == {
+        "Redirect": False, "Tracking": True, "SPF": False, "DMARC": False, "Mail Settings": False}
+
+
+class RedirectHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self.send_response(301)
+        self.send_header("Location", self.server.location)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = HTTPServer(("127.0.0.1", 0), RedirectHandler)
+    server.location = build_redirect_url(CUSTOMER, DOMAIN)
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_redirect_records(http_server):
+    verifier = DNSVerifier(DNSResolver(server="127.0.0.1", timeout=1))
+    host, port = http_server.server_address
+    records = verifier.http_redirect_records({"domain": f"{host}:{port}"})
+    assert records == [{"Type": "URL301", "Name": "@", "Address": http_server.location, "TTL": None}]
+
+
+def test_http_redirect_unreachable_site_is_not_an_error():
+    verifier = DNSVerifier(DNSResolver(server="127.0.0.1", timeout=1))
+    # Порт 9 (discard) закрыт: ошибка соединения дает пустой список, а не исключение
+    assert verifier.http_redirect_records({"domain": "127.0.0.1:9"}) == []
+
+
+def test_redirect_check_http_skips_get_hosts(dns_server, http_server, monkeypatch):
+    host, port = dns_server.address
+    engine = make_engine(verify_method="dns", redirect_check="http", dns_server=host, dns_port=port,
+                         dns_timeout=1)
+    engine.dmarc_dict = {DOMAIN: [DMARC]}
+    monkeypatch.setattr(engine, "get_redirect_records", lambda info: pytest.fail("getHosts must not be called"))
+    verifier = engine.open_dns_verifier()
+    http_host, http_port = http_server.server_address
+    # Сайт домена отвечает с локального HTTP сервера
+    monkeypatch.setattr(verifier, "http_redirect_records",
+                        lambda info: DNSVerifier.http_redirect_records(verifier, {"domain": f"{http_host}:{http_port}"}))
+
+    [(info, result)] = list(engine.fetch_records([domain_info()]))
+    assert engine.check_domain(info, result) == dict.fromkeys(CHECK_COLUMNS, True)
+    # Повторный раунд использует тот же резолвер
+    assert engine.open_dns_verifier() is verifier
+
+
+def test_redirect_check_api_fetches_get_hosts_once(dns_server, monkeypatch):
+    host, port = dns_server.address
+    engine = make_engine(verify_method="dns", dns_server=host, dns_port=port, dns_timeout=1)
+    engine.dmarc_dict = {DOMAIN: [DMARC]}
+    calls = []
+    redirect = {"Type": "URL301", "Name": "@", "Address": build_redirect_url(CUSTOMER, DOMAIN), "TTL": "1800"}
+
+    def get_dns_records(domain):
+        calls.append(domain)
+        return {"status": "success", "records": [redirect]}
+
+    monkeypatch.setattr(engine, "get_dns_records", get_dns_records)
+    # Раунды опроса: URL301 от распространения DNS не зависит, getHosts не повторяется
+    for _ in range(3):
+        [(info, result)] = list(engine.fetch_records([domain_info()]))
+        assert engine.check_domain(info, result) == dict.fromkeys(CHECK_COLUMNS, True)
+    assert calls == [DOMAIN]
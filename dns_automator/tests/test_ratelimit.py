@@ -0,0 +1,59 @@
+"""Проверка RateLimiter: сохранение квоты между процессами и учет ожидания"""
+import json
+
+from ratelimit import RATE_LIMIT_STATE_FILE, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_state_survives_new_limiter(tmp_path):
+    limiter = RateLimiter.from_settings({"api_rate_per_hour": 10}, state_dir=str(tmp_path))
+    for _ in range(10):
+        assert limiter.try_acquire() == 0
+    limiter.save()
+
+    # Следующий запуск cli.py: новое ведро не должно начинаться полным
+    restarted = RateLimiter.from_settings({"api_rate_per_hour": 10}, state_dir=str(tmp_path))
+    assert restarted.try_acquire() > 0
+
+
+def test_saved_tokens_refill_for_elapsed_time(tmp_path):
+    path = tmp_path / RATE_LIMIT_STATE_FILE
+    limiter = RateLimiter(per_minute=0, per_hour=3600, per_day=0, path=str(path))
+    for _ in range(3600):
+        limiter.try_acquire()
+    limiter.save()
+
+    state = json.loads(path.read_text())
+    state["saved_at"] -= 5
+    path.write_text(json.dumps(state))
+    # За 5 секунд при 1 токене в секунду накопилось около пяти токенов
+    restarted = RateLimiter(per_minute=0, per_hour=3600, per_day=0, path=str(path))
+    assert 5 <= restarted.buckets["hour"].tokens < 6
+
+
+def test_broken_state_file_is_ignored(tmp_path):
+    (tmp_path / RATE_LIMIT_STATE_FILE).write_text("not json")
+    limiter = RateLimiter.from_settings({"api_rate_per_hour": 10}, state_dir=str(tmp_path))
+    assert limiter.buckets["hour"].tokens == 10
+
+
+def test_total_wait_counts_only_real_waits():
+    clock = FakeClock()
+    limiter = RateLimiter(per_minute=60, per_hour=0, per_day=0, burst=1, clock=clock)
+    # Токен есть сразу: время между вызовами clock() в total_wait не попадает
+    original = limiter.try_acquire
+
+    def slow_try_acquire():
+        clock.now += 0.5
+        return original()
+
+    limiter.try_acquire = slow_try_acquire
+    assert limiter.acquire()
+    assert limiter.total_wait == 0.0